@@ -0,0 +1,74 @@
+# python benchmarks/bench_catalog.py [--outfits 10000]
+#
+# Compares the per-rerun directory scan that load_clothes_options used to do
+# with the in-memory ClothesCatalog index for a synthetic catalog.
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from catalog import ClothesCatalog  # noqa: E402
+from common import make_catalog, time_calls  # noqa: E402
+
+
+def scan_per_rerun(clothes_dir, clothes_describe_dir):
+    """The original load_clothes_options: listdir plus an exists() per outfit on every rerun."""
+    clothes_options = []
+    for clothes_file in [f for f in os.listdir(clothes_dir) if f.endswith('.png')]:
+        clothes_name = os.path.splitext(clothes_file)[0]
+        description_path = os.path.join(clothes_describe_dir, f"{clothes_name}.txt")
+        if os.path.exists(description_path):
+            clothes_options.append({'name': clothes_name, 'description_path': description_path})
+    return clothes_options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog loading.")
+    parser.add_argument("--outfits", type=int, default=10000, help="Number of synthetic outfits")
+    parser.add_argument("--repeats", type=int, default=20, help="Calls measured per mode")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_catalog_")
+    try:
+        clothes_dir, describe_dir = make_catalog(work_dir, args.outfits)
+        results = {'outfits': args.outfits, 'modes': {}}
+
+        results['modes']['scan_per_rerun'] = time_calls(lambda: scan_per_rerun(clothes_dir, describe_dir),
+                                                        args.repeats)
+        results['modes']['initial_index_build'] = time_calls(lambda: ClothesCatalog(clothes_dir, describe_dir), 3)
+
+        # Reruns are served from the last index and never touch the filesystem
+        catalog = ClothesCatalog(clothes_dir, describe_dir)
+        results['modes']['rerun_lookup'] = time_calls(catalog.options, args.repeats)
+
+        # The watcher thread stat()s every file once per refresh interval, off the request path
+        results['modes']['change_check'] = time_calls(catalog.refresh, args.repeats)
+
+        def add_and_refresh():
+            # One new garment: the rescan reuses every unchanged description
+            name = f"new_{time.perf_counter_ns()}"
+            open(os.path.join(clothes_dir, f"{name}.png"), 'wb').close()
+            with open(os.path.join(describe_dir, f"{name}.txt"), 'w', encoding='utf-8') as file:
+                file.write("A new outfit.")
+            catalog.refresh()
+        results['modes']['incremental_refresh'] = time_calls(add_and_refresh, 5)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for mode, summary in results['modes'].items():
+        print(f"{mode:>20}: median {summary['p50_ms']:10.3f} ms, max {summary['max_ms']:10.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
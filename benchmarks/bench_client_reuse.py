@@ -0,0 +1,94 @@
+# python benchmarks/bench_client_reuse.py [--generations 10]
+#
+# Compares a fresh generator + genai.Client per generation (the old ui.py
+# behaviour) with one shared generator, against a local fake Gemini server
+# that counts the TCP connections opened.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ROOT_DIR = os.path.join(SRC_DIR, "..")
+sys.path.insert(0, SRC_DIR)
+
+from google import genai  # noqa: E402
+
+from cache import PoseCache  # noqa: E402
+from fake_client import FakeGeminiServer  # noqa: E402
+from gen_image import AnimalClothesGenerator, create_client  # noqa: E402
+
+REQUEST = dict(
+    animal_image_path=os.path.join(ROOT_DIR, "images/animals/dog_1.png"),
+    clothes_image_path=os.path.join(ROOT_DIR, "images/clothes/clothes_1.png"),
+    clothes_description_path=os.path.join(ROOT_DIR, "images/clothes_describe/clothes_1.txt"),
+    show_image=False,
+)
+
+
+def run_per_request(server, generations):
+    setup_seconds = request_seconds = 0.0
+    for _ in range(generations):
+        start = time.perf_counter()
+        client = genai.Client(api_key="offline-benchmark", http_options={'base_url': server.base_url})
+        generator = AnimalClothesGenerator(client=client, pose_cache=PoseCache(cache_dir=None),
+                                           use_result_cache=False)
+        setup_seconds += time.perf_counter() - start
+        generator.generate_dressed_animal(**REQUEST)
+        request_seconds += generator.timing_report()['request_seconds']
+    return setup_seconds, request_seconds
+
+
+def run_shared(server, generations, threads):
+    start = time.perf_counter()
+    client = create_client(api_key="offline-benchmark", http_options={'base_url': server.base_url})
+    generator = AnimalClothesGenerator(client=client, pose_cache=PoseCache(cache_dir=None),
+                                       use_result_cache=False)
+    setup_seconds = time.perf_counter() - start
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: generator.generate_dressed_animal(**REQUEST), range(generations)))
+    return setup_seconds, generator.timing_report()['request_seconds']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark client reuse against a local fake Gemini server.")
+    parser.add_argument("--generations", type=int, default=10, help="Generations per mode")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent sessions for the shared-concurrent mode")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency per request in seconds")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    modes = {
+        'per_request': lambda server: run_per_request(server, args.generations),
+        'shared': lambda server: run_shared(server, args.generations, 1),
+        'shared_concurrent': lambda server: run_shared(server, args.generations, args.threads),
+    }
+
+    results = {'generations': args.generations, 'modes': {}}
+    for mode, run in modes.items():
+        with FakeGeminiServer(latency=args.latency) as server:
+            start = time.perf_counter()
+            setup_seconds, request_seconds = run(server)
+            wall_seconds = time.perf_counter() - start
+            results['modes'][mode] = {
+                'connections_opened': server.connections,
+                'requests': server.requests,
+                'setup_seconds': round(setup_seconds, 4),
+                'request_seconds': round(request_seconds, 4),
+                'wall_seconds': round(wall_seconds, 4),
+            }
+
+    for mode, summary in results['modes'].items():
+        print(f"{mode:>18}: {summary['connections_opened']:3d} connections for {summary['requests']:3d} requests, "
+              f"setup {summary['setup_seconds']:.3f}s, requests {summary['request_seconds']:.3f}s, "
+              f"wall {summary['wall_seconds']:.3f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
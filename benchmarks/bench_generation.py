@@ -0,0 +1,267 @@
+# python benchmarks/bench_generation.py [--latency 0.5] [--jitter 0.2] [--output results.json]
+#
+# Offline throughput and tail-latency benchmark for the generation pipeline
+# and the UI helpers, against the fake Gemini backend (no API key needed):
+#
+#   single      sequential generate_dressed_animal calls
+#   stream      sequential stream_dressed_animal calls, with time to first model text
+#   batch       generate_wardrobe for one pet and many outfits
+#   concurrent  AsyncAnimalClothesGenerator.agenerate_many
+#   grid        Streamlit reruns of ui.display_clothes_selection
+#   catalog     load_clothes_options and the warm ClothesCatalog index
+#
+# Results are written as JSON with --output. Pass an earlier file with
+# --compare to fail (exit code 1) when a mode's p95 regressed.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ROOT_DIR = os.path.join(SRC_DIR, "..")
+sys.path.insert(0, SRC_DIR)
+
+from async_gen_image import AsyncAnimalClothesGenerator  # noqa: E402
+from cache import PoseCache  # noqa: E402
+from catalog import ClothesCatalog, load_clothes_options  # noqa: E402
+from common import grid_app, make_catalog, make_outfit_images, summarize, time_calls  # noqa: E402
+from events import TextChunk  # noqa: E402
+from fake_client import FakeClient  # noqa: E402
+from gen_image import AnimalClothesGenerator  # noqa: E402
+
+ANIMAL_IMAGE_PATH = os.path.join(ROOT_DIR, "images/animals/dog_1.png")
+CLOTHES_DIR = os.path.join(ROOT_DIR, "images/clothes")
+CLOTHES_DESCRIBE_DIR = os.path.join(ROOT_DIR, "images/clothes_describe")
+
+MODES = ("single", "stream", "batch", "concurrent", "grid", "catalog")
+
+
+def stage_summary(generator):
+    """Per-stage p50/p95 in milliseconds from the generator's metrics."""
+    return {stage: {'count': stats['count'], 'p50_ms': round(stats['p50'] * 1000, 3),
+                    'p95_ms': round(stats['p95'] * 1000, 3)}
+            for stage, stats in generator.metrics.summary().items()}
+
+
+def make_client(args):
+    return FakeClient(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_code=args.error_code, seed=args.seed)
+
+
+def make_generator(args, generator_class=AnimalClothesGenerator, **kwargs):
+    # In-memory pose cache and no result cache: every generation calls the image model
+    return generator_class(client=make_client(args), pose_cache=PoseCache(cache_dir=None),
+                           use_result_cache=False, **kwargs)
+
+
+def repo_clothes_options(count):
+    """count outfits cycling through the repository's sample clothes, with unique names."""
+    samples = load_clothes_options(CLOTHES_DIR, CLOTHES_DESCRIBE_DIR)
+    return [dict(samples[index % len(samples)], name=f"outfit_{index}") for index in range(count)]
+
+
+def bench_single(args, work_dir):
+    generator = make_generator(args)
+    clothes = repo_clothes_options(1)[0]
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    for _ in range(args.generations):
+        call_start = time.perf_counter()
+        try:
+            generator.generate_dressed_animal(ANIMAL_IMAGE_PATH, clothes['image_path'], clothes['description_path'],
+                                              show_image=False, clothes_description=clothes['description'])
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - call_start)
+    summary = summarize(latencies, time.perf_counter() - start, failures)
+    summary['stages'] = stage_summary(generator)
+    return summary
+
+
+def bench_stream(args, work_dir):
+    generator = make_generator(args)
+    clothes = repo_clothes_options(1)[0]
+    latencies, first_text, failures = [], [], 0
+    start = time.perf_counter()
+    for _ in range(args.generations):
+        call_start = time.perf_counter()
+        try:
+            for event in generator.stream_dressed_animal(ANIMAL_IMAGE_PATH, clothes['image_path'],
+                                                         clothes['description_path'],
+                                                         clothes_description=clothes['description']):
+                if isinstance(event, TextChunk) and len(first_text) < len(latencies) + 1:
+                    first_text.append(time.perf_counter() - call_start)
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - call_start)
+    summary = summarize(latencies, time.perf_counter() - start, failures)
+    if first_text:
+        summary['first_text'] = summarize(first_text)
+    summary['stages'] = stage_summary(generator)
+    return summary
+
+
+def bench_batch(args, work_dir):
+    generator = make_generator(args)
+    clothes_options = repo_clothes_options(args.generations)
+    start = time.perf_counter()
+    entries = list(generator.generate_wardrobe(ANIMAL_IMAGE_PATH, clothes_options, os.path.join(work_dir, "wardrobe"),
+                                               max_workers=args.concurrency))
+    wall_seconds = time.perf_counter() - start
+    failures = sum(1 for entry in entries if entry['status'] != 'ok')
+    summary = summarize([entry['latency_seconds'] for entry in entries], wall_seconds, failures)
+    summary['stages'] = stage_summary(generator)
+    return summary
+
+
+def bench_concurrent(args, work_dir):
+    generator = make_generator(args, AsyncAnimalClothesGenerator, max_concurrency=args.concurrency)
+    clothes_options = repo_clothes_options(args.generations)
+
+    async def timed(clothes):
+        start = time.perf_counter()
+        try:
+            await generator.agenerate_dressed_animal(ANIMAL_IMAGE_PATH, clothes['image_path'],
+                                                     clothes['description_path'],
+                                                     clothes_description=clothes['description'])
+            failed = False
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    async def run_all():
+        return await asyncio.gather(*(timed(clothes) for clothes in clothes_options))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    wall_seconds = time.perf_counter() - start
+    summary = summarize([latency for latency, _ in results], wall_seconds,
+                        sum(1 for _, failed in results if failed))
+    summary['peak_in_flight'] = generator.client.max_in_flight
+    summary['stages'] = stage_summary(generator)
+    return summary
+
+
+def bench_grid(args, work_dir):
+    image_dir = os.path.join(work_dir, "grid")
+    os.makedirs(image_dir)
+    options = make_outfit_images(image_dir, args.outfits)
+    app = AppTest.from_function(grid_app, args=(SRC_DIR, options, os.path.join(work_dir, "thumbnails")),
+                                default_timeout=600)
+    st.cache_data.clear()
+    latencies = []
+    for _ in range(args.reruns + 1):
+        start = time.perf_counter()
+        app.run()
+        latencies.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    # The first rerun renders every thumbnail; the rest are what users see while browsing
+    summary = summarize(latencies[1:])
+    summary['first_rerun_ms'] = round(latencies[0] * 1000, 3)
+    return summary
+
+
+def bench_catalog(args, work_dir):
+    clothes_dir, describe_dir = make_catalog(os.path.join(work_dir, "catalog"), args.catalog_outfits)
+    cold_load = time_calls(lambda: load_clothes_options(clothes_dir, describe_dir), args.reruns)
+
+    catalog = ClothesCatalog(clothes_dir, describe_dir)
+    catalog.options()
+    summary = time_calls(catalog.options, args.reruns)
+    summary['cold_load'] = cold_load
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return one message per mode whose p95 grew by more than tolerance (and min_delta_ms) over the baseline."""
+    regressions = []
+    for mode, summary in results['modes'].items():
+        before = baseline.get('modes', {}).get(mode)
+        if not before or not before.get('p95_ms'):
+            continue
+        change = summary['p95_ms'] / before['p95_ms'] - 1
+        # Sub-millisecond modes are too noisy for a relative threshold alone
+        if change > tolerance and summary['p95_ms'] - before['p95_ms'] > min_delta_ms:
+            regressions.append(f"{mode}: p95 {before['p95_ms']:.1f} ms -> {summary['p95_ms']:.1f} ms "
+                               f"(+{change * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of generation and UI helpers.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Modes to run")
+    parser.add_argument("--generations", type=int, default=20, help="Generations per generation mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel calls for batch and concurrent")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake model latency per call in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random latency per call, up to this")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake calls that fail")
+    parser.add_argument("--error-code", type=int, default=503, help="HTTP status of failed calls, e.g. 429")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and error injection")
+    parser.add_argument("--outfits", type=int, default=100, help="Outfits in the grid mode")
+    parser.add_argument("--catalog-outfits", type=int, default=5000, help="Outfits in the catalog mode")
+    parser.add_argument("--reruns", type=int, default=5, help="Measured reruns for grid and catalog")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to check for p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 growth for --compare")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore p95 growth below this for --compare")
+    args = parser.parse_args()
+
+    runners = {'single': bench_single, 'stream': bench_stream, 'batch': bench_batch, 'concurrent': bench_concurrent,
+               'grid': bench_grid, 'catalog': bench_catalog}
+    results = {
+        'revision': git_revision(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'parameters': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'modes': {},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="bench_generation_")
+    try:
+        for mode in args.modes:
+            results['modes'][mode] = runners[mode](args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for mode, summary in results['modes'].items():
+        line = (f"{mode:>10}: p50 {summary['p50_ms']:10.3f} ms, p95 {summary['p95_ms']:10.3f} ms, "
+                f"p99 {summary['p99_ms']:10.3f} ms ({summary['runs']} runs, {summary['failures']} failed)")
+        if 'throughput_per_second' in summary:
+            line += f", {summary['throughput_per_second']:.2f}/s"
+        if 'first_text' in summary:
+            line += f", first text p50 {summary['first_text']['p50_ms']:.1f} ms"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance, args.min_delta_ms)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
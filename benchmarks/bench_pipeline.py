@@ -0,0 +1,104 @@
+# python benchmarks/bench_pipeline.py [--sessions 8] [--think-time 1.5]
+#
+# Compares the pipeline modes as a user sees them: the latency from clicking
+# "Style My Pet" to getting the image, for sessions that upload a new photo,
+# spend think-time picking an outfit, then generate. Runs against the fake
+# Gemini backend with separate pose and image model latencies.
+#
+#   two_call     pose analysis and image generation after the click
+#   speculative  pose analysis starts on upload (ui.PIPELINE_MODE = "speculative")
+#   single_call  one image model call with the pose instructions in the prompt
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ROOT_DIR = os.path.join(SRC_DIR, "..")
+sys.path.insert(0, SRC_DIR)
+
+from cache import PoseCache  # noqa: E402
+from common import summarize  # noqa: E402
+from fake_client import FakeClient  # noqa: E402
+from gen_image import (IMAGE_MODEL, PIPELINE_SINGLE_CALL, PIPELINE_TWO_CALL, POSE_MODEL,  # noqa: E402
+                       AnimalClothesGenerator)
+
+ANIMAL_IMAGE_PATH = os.path.join(ROOT_DIR, "images/animals/dog_1.png")
+CLOTHES_IMAGE_PATH = os.path.join(ROOT_DIR, "images/clothes/clothes_1.png")
+CLOTHES_DESCRIPTION_PATH = os.path.join(ROOT_DIR, "images/clothes_describe/clothes_1.txt")
+
+MODES = ("two_call", "speculative", "single_call")
+
+
+def run_session(generator, photo, mode, think_time):
+    """One user: upload, pick an outfit, click. Returns the click-to-image latency."""
+    # The UI prepares the upload right away in every mode
+    animal_image = generator.preprocessor.prepare(photo)
+    if mode == "speculative":
+        generator.prefetch_pose(animal_image)
+    time.sleep(think_time)
+
+    start = time.perf_counter()
+    generator.generate_dressed_animal(
+        animal_image, CLOTHES_IMAGE_PATH, CLOTHES_DESCRIPTION_PATH, show_image=False,
+        pipeline=PIPELINE_SINGLE_CALL if mode == "single_call" else PIPELINE_TWO_CALL,
+    )
+    return time.perf_counter() - start
+
+
+def run_mode(mode, photos, args):
+    client = FakeClient(jitter=args.jitter, seed=args.seed,
+                        model_latency={POSE_MODEL: args.pose_latency, IMAGE_MODEL: args.image_latency})
+    generator = AnimalClothesGenerator(client=client, pose_cache=PoseCache(cache_dir=None), use_result_cache=False)
+    # Encode the shared outfit once so every session starts from the same state
+    generator.preprocessor.prepare(CLOTHES_IMAGE_PATH)
+
+    with ThreadPoolExecutor(max_workers=len(photos)) as executor:
+        latencies = list(executor.map(lambda photo: run_session(generator, photo, mode, args.think_time), photos))
+
+    summary = summarize(latencies)
+    summary['model_calls_per_session'] = round(len(client.calls) / len(latencies), 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark click-to-image latency of the pipeline modes.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent user sessions per mode")
+    parser.add_argument("--pose-latency", type=float, default=1.0, help="Fake pose model latency in seconds")
+    parser.add_argument("--image-latency", type=float, default=2.0, help="Fake image model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Extra random latency per call, up to this")
+    parser.add_argument("--think-time", type=float, default=1.5, help="Seconds between upload and click")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the fake backend's jitter")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # A different photo per session, so no mode gets pose cache hits across sessions
+    with Image.open(ANIMAL_IMAGE_PATH) as image:
+        base = image.convert("RGB")
+    photos = []
+    for index in range(args.sessions):
+        photo = base.copy()
+        photo.putpixel((index, 0), (index % 256, 0, 0))
+        photos.append(photo)
+
+    results = {'parameters': {name: value for name, value in vars(args).items() if name != 'output'}, 'modes': {}}
+    for mode in MODES:
+        results['modes'][mode] = run_mode(mode, photos, args)
+
+    baseline = results['modes']['two_call']['p50_ms']
+    for mode, summary in results['modes'].items():
+        print(f"{mode:>12}: median {summary['p50_ms']:8.1f} ms, p95 {summary['p95_ms']:8.1f} ms, "
+              f"{summary['model_calls_per_session']:.1f} calls/session, "
+              f"{summary['p50_ms'] / baseline:.2f}x of two_call")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
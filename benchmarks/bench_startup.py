@@ -0,0 +1,115 @@
+# python benchmarks/bench_startup.py [--runs 5]
+#
+# Cold-start cost of the entry points: each target runs in a fresh
+# interpreter under -X importtime, and the wall time plus the import time
+# reported by Python are summarised, with the heaviest top-level imports.
+#
+#   import gen_image   what every script and the UI pay before the first call
+#   import ui          the Streamlit page module (run bare, outside streamlit)
+#   wardrobe --help    a CLI invocation that never calls the model
+#   matrix --help      a CLI invocation that never calls the model
+#   generator          constructing an AnimalClothesGenerator, without a request
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ROOT_DIR = os.path.join(SRC_DIR, "..")
+
+TARGETS = {
+    'import gen_image': ["-c", "import gen_image"],
+    'import ui': ["-c", "import ui"],
+    'wardrobe --help': [os.path.join(SRC_DIR, "wardrobe.py"), "--help"],
+    'matrix --help': [os.path.join(SRC_DIR, "matrix.py"), "--help"],
+    'generator': ["-c", "from cache import PoseCache; from gen_image import AnimalClothesGenerator; "
+                        "AnimalClothesGenerator(env_path=os.devnull, pose_cache=PoseCache(cache_dir=None), "
+                        "use_result_cache=False)"],
+}
+
+# Third-party packages whose import cost is reported separately
+HEAVY_MODULES = ("google.genai", "PIL.Image", "dotenv", "httpx", "streamlit")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    Total import seconds, and cumulative seconds of each module, from -X importtime output.
+
+    A module only shows up where it is imported first, so its cumulative
+    time is what the process paid for it.
+    """
+    total, modules = 0.0, {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        seconds = int(match.group(2)) / 1e6
+        modules[match.group(4)] = seconds
+        if len(match.group(3)) == 1:
+            total += seconds
+    return total, modules
+
+
+def run_target(args, runs):
+    # A placeholder key lets the generator build its client; nothing is sent
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    env.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    # -c snippets may use os without importing it
+    if args[0] == "-c":
+        args = ["-c", "import os; " + args[1]]
+
+    walls, imports, heavy = [], [], {name: [] for name in HEAVY_MODULES}
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT_DIR, env=env,
+                                   capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+        total, modules = parse_importtime(completed.stderr)
+        imports.append(total)
+        for name in HEAVY_MODULES:
+            heavy[name].append(modules.get(name, 0.0))
+
+    return {
+        'runs': runs,
+        'wall_median_ms': round(statistics.median(walls) * 1000, 1),
+        'import_median_ms': round(statistics.median(imports) * 1000, 1),
+        # 0 means the module was never imported
+        'heavy_imports_ms': {name: round(statistics.median(values) * 1000, 1) for name, values in heavy.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import cost of the entry points.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=list(TARGETS),
+                        help="Targets to run")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # One untimed run so every target starts from warm bytecode and OS file caches
+    for name in args.targets:
+        run_target(TARGETS[name], 1)
+
+    results = {'python': sys.version.split()[0], 'targets': {}}
+    for name in args.targets:
+        summary = results['targets'][name] = run_target(TARGETS[name], args.runs)
+        loaded = ", ".join(f"{module} {seconds:.0f}" for module, seconds in summary['heavy_imports_ms'].items()
+                           if seconds) or "none"
+        print(f"{name:>16}: wall {summary['wall_median_ms']:7.1f} ms, imports {summary['import_median_ms']:7.1f} ms"
+              f" (heavy ms: {loaded})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# python benchmarks/bench_thumbnails.py [--outfits 500] [--reruns 5]
+#
+# Measures Streamlit rerun latency of the outfit grid (ui.display_clothes_selection)
+# for a synthetic catalog, with and without the thumbnail cache.
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from common import grid_app, make_outfit_images, summarize  # noqa: E402
+from thumbnails import get_thumbnail_bytes  # noqa: E402
+
+
+def time_reruns(options, thumbnail_cache_dir, mode, reruns):
+    """Run the grid script repeatedly and return per-rerun latencies in seconds."""
+    app = AppTest.from_function(grid_app, args=(SRC_DIR, options, thumbnail_cache_dir, mode),
+                                default_timeout=600)
+    # Start every mode without anything memoised from a previous one
+    st.cache_data.clear()
+    latencies = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        latencies.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark outfit grid rerun latency.")
+    parser.add_argument("--outfits", type=int, default=500, help="Number of synthetic outfits")
+    parser.add_argument("--source-size", type=int, nargs=2, default=(1024, 1024), help="Source image size")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns measured per mode")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_thumbnails_")
+    try:
+        catalog_dir = os.path.join(work_dir, "clothes")
+        thumbnail_cache_dir = os.path.join(work_dir, "thumbnails")
+        os.makedirs(catalog_dir)
+        options = make_outfit_images(catalog_dir, args.outfits, tuple(args.source_size))
+
+        results = {'outfits': args.outfits, 'source_size': list(args.source_size), 'modes': {}}
+        results['modes']['uncached'] = summarize(time_reruns(options, thumbnail_cache_dir, "uncached", args.reruns))
+        # First rerun after start-up renders everything; later reruns hit the in-process memo
+        warm = time_reruns(options, thumbnail_cache_dir, "memo", args.reruns + 1)
+        results['modes']['cold_first_rerun'] = summarize(warm[:1])
+        results['modes']['memoised'] = summarize(warm[1:])
+        # Every thumbnail is on disk now; measure a restarted process without the memo
+        for option in options:
+            get_thumbnail_bytes(option['image_path'], cache_dir=thumbnail_cache_dir)
+        results['modes']['disk_cache'] = summarize(time_reruns(options, thumbnail_cache_dir, "disk", args.reruns))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for mode, summary in results['modes'].items():
+        print(f"{mode:>18}: median {summary['p50_ms']:8.1f} ms, max {summary['max_ms']:8.1f} ms "
+              f"({summary['runs']} reruns, {args.outfits} outfits)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
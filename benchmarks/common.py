@@ -0,0 +1,111 @@
+# Fixtures and result helpers shared by the benchmark scripts.
+#
+# Not a benchmark itself: the scripts in this directory import it, since
+# Python puts the running script's directory on sys.path.
+import os
+import statistics
+import time
+
+
+def summarize(latencies, wall_seconds=None, failures=0):
+    """Latency percentiles in milliseconds, plus throughput when the wall time is known."""
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    summary = {
+        'runs': len(ordered),
+        'failures': failures,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(percentile(0.50) * 1000, 3),
+        'p95_ms': round(percentile(0.95) * 1000, 3),
+        'p99_ms': round(percentile(0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+    if wall_seconds is not None:
+        summary['wall_seconds'] = round(wall_seconds, 3)
+        summary['throughput_per_second'] = round((len(ordered) - failures) / wall_seconds, 3)
+    return summary
+
+
+def time_calls(function, repeats):
+    """Call function repeats times and summarize the latencies."""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def make_outfit_images(directory, count, size=(1024, 1024)):
+    """Write count synthetic outfit PNGs and return them as clothes options."""
+    from PIL import Image, ImageDraw
+
+    options = []
+    for index in range(count):
+        image = Image.new("RGB", size, ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+        ImageDraw.Draw(image).ellipse((size[0] // 5, size[1] // 5, size[0] * 4 // 5, size[1] * 4 // 5),
+                                      fill=(240, 200, 80))
+        image_path = os.path.join(directory, f"outfit_{index}.png")
+        image.save(image_path)
+        options.append({'name': f"outfit_{index}", 'image_path': image_path, 'description_path': None,
+                        'description': "", 'image_mtime_ns': os.stat(image_path).st_mtime_ns})
+    return options
+
+
+def make_catalog(root, count):
+    """Write a clothes and a clothes_describe directory with count outfits; return both paths."""
+    clothes_dir = os.path.join(root, "clothes")
+    describe_dir = os.path.join(root, "clothes_describe")
+    os.makedirs(clothes_dir)
+    os.makedirs(describe_dir)
+    for index in range(count):
+        # The catalog never decodes images, so empty files are enough
+        open(os.path.join(clothes_dir, f"outfit_{index}.png"), 'wb').close()
+        with open(os.path.join(describe_dir, f"outfit_{index}.txt"), 'w', encoding='utf-8') as file:
+            file.write(f"A silk outfit number {index} with a gold collar.")
+    return clothes_dir, describe_dir
+
+
+def grid_app(src_dir, options, thumbnail_cache_dir, mode="memo"):
+    """
+    Streamlit script rendering the outfit grid, for AppTest.from_function.
+
+    mode "memo" is the UI's real memoised path, "disk" the on-disk thumbnail
+    tier alone (a freshly started process) and "uncached" the behaviour from
+    before the thumbnail cache, which renders every image on every rerun.
+    """
+    # Runs as a Streamlit script inside AppTest, so everything is imported here
+    import sys
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from io import BytesIO
+
+    from PIL import Image
+
+    import thumbnails
+    import ui
+
+    # The ui module outlives a single AppTest, so remember the real memoised loader
+    if not hasattr(ui, "_memoised_load_thumbnail"):
+        ui._memoised_load_thumbnail = ui.load_thumbnail
+    ui.load_thumbnail = ui._memoised_load_thumbnail
+
+    if mode == "uncached":
+        def render(image_path, mtime_ns, size):
+            buffer = BytesIO()
+            with Image.open(image_path) as image:
+                thumbnails.make_thumbnail(image, size).save(buffer, format="PNG")
+            return buffer.getvalue()
+        ui.load_thumbnail = render
+    elif mode == "disk":
+        ui.load_thumbnail = lambda image_path, mtime_ns, size: thumbnails.get_thumbnail_bytes(
+            image_path, size, cache_dir=thumbnail_cache_dir, mtime_ns=mtime_ns)
+    else:
+        # Pointed at the benchmark's cache directory instead of the repository's
+        ui.get_thumbnail_bytes = lambda image_path, size, mtime_ns=None: thumbnails.get_thumbnail_bytes(
+            image_path, size, cache_dir=thumbnail_cache_dir, mtime_ns=mtime_ns)
+
+    ui.display_clothes_selection(options)
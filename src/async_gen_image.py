@@ -0,0 +1,121 @@
+import asyncio
+import time
+import weakref
+
+from gen_image import AnimalClothesGenerator
+
+
+class AsyncAnimalClothesGenerator(AnimalClothesGenerator):
+    """
+    AnimalClothesGenerator for asyncio code: bounds how many generations run at
+    once and gives each one a deadline.
+    """
+
+    def __init__(self, env_path="env/.env", max_concurrency=16, timeout=180.0, **generator_kwargs):
+        """
+        Initialize the async generator.
+
+        Args:
+            env_path (str): Path to the environment file containing API keys
+            max_concurrency (int): Maximum number of generations in flight at once
+            timeout (float, optional): Per-request timeout in seconds; None waits forever
+            **generator_kwargs: Passed to AnimalClothesGenerator (client, pose_cache,
+                preprocessor, result_cache, use_result_cache)
+        """
+        super().__init__(env_path=env_path, **generator_kwargs)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # One semaphore per event loop: a semaphore binds to the first loop that
+        # waits on it, and each asyncio.run() call starts a new loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def agenerate_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path,
+                                       save_path=None, clothes_description=None, use_result_cache=None,
+                                       timeout=None, pipeline=None):
+        """
+        Generate a dressed animal image, waiting for a free concurrency slot first.
+
+        Cancelling the awaiting task cancels the in-flight model call.
+
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object or a PIL image
+            clothes_image_path (str): Path to the clothes image
+            clothes_description_path (str): Path to the text file containing clothes description
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            timeout (float, optional): Overrides the generator's default timeout; also the
+                deadline for rate limit queueing and retries of the model calls
+            pipeline (str, optional): Override the generator's pipeline mode
+
+        Returns:
+            PIL.Image: Generated image object
+
+        Raises:
+            asyncio.TimeoutError: If the generation does not finish within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._get_semaphore():
+            return await asyncio.wait_for(
+                super().agenerate_dressed_animal(
+                    animal_image_path, clothes_image_path, clothes_description_path, save_path=save_path,
+                    clothes_description=clothes_description, use_result_cache=use_result_cache,
+                    timeout=timeout, pipeline=pipeline
+                ),
+                timeout=timeout,
+            )
+
+    async def agenerate_many(self, requests, return_exceptions=True):
+        """
+        Run several generations concurrently, bounded by max_concurrency.
+
+        Args:
+            requests (list[dict]): Keyword arguments for agenerate_dressed_animal, one per generation
+            return_exceptions (bool): Return failures in place of results instead of raising
+
+        Returns:
+            list: Generated images (or exceptions) in the order of requests
+        """
+        return await asyncio.gather(
+            *(self.agenerate_dressed_animal(**request) for request in requests),
+            return_exceptions=return_exceptions,
+        )
+
+
+# Example usage: 32 generations against a fake client with 0.5s latency per call
+if __name__ == "__main__":
+    from cache import PoseCache
+    from fake_client import FakeClient
+    from scheduler import ModelScheduler
+
+    fake_client = FakeClient(latency=0.5)
+    # No client-side rate limits, so the demo measures concurrency alone
+    generator = AsyncAnimalClothesGenerator(client=fake_client, pose_cache=PoseCache(cache_dir=None),
+                                            use_result_cache=False, max_concurrency=16, scheduler=ModelScheduler())
+    requests = [
+        dict(
+            animal_image_path="images/animals/dog_1.png",
+            clothes_image_path="images/clothes/clothes_1.png",
+            clothes_description_path="images/clothes_describe/clothes_1.txt",
+        )
+        for _ in range(32)
+    ]
+
+    start = time.perf_counter()
+    results = asyncio.run(generator.agenerate_many(requests))
+    elapsed = time.perf_counter() - start
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    print(f"{len(results)} generations in {elapsed:.2f}s, {len(failures)} failed, "
+          f"peak in-flight calls: {fake_client.max_in_flight}")
+    for stage, summary in generator.metrics.summary().items():
+        print(f"{stage:<55} n={summary['count']:3d} p50 {summary['p50'] * 1000:7.1f} ms "
+              f"p95 {summary['p95'] * 1000:7.1f} ms")
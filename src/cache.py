@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def hash_image_pixels(image):
+    """
+    Compute a content hash of an image's decoded pixels.
+
+    Two files with the same pixels (e.g. the same photo re-saved by the UI)
+    hash to the same value, regardless of file name or encoder settings.
+
+    Args:
+        image (PIL.Image.Image): Image to hash
+
+    Returns:
+        str: Hex digest of the pixel data, mode and size
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def make_cache_key(*parts):
+    """
+    Build a cache key from several string parts.
+
+    Args:
+        *parts (str): Values that together identify a cached entry
+
+    Returns:
+        str: Hex digest combining all parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = str(part).encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        digest.update(f"{len(encoded)}:".encode("utf-8"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class PoseCache:
+    """
+    Two-tier cache for pose descriptions: an in-memory LRU in front of a
+    directory of JSON files that survives restarts.
+    """
+
+    def __init__(self, cache_dir="cache/pose", max_memory_entries=256,
+                 max_disk_entries=5000, ttl_seconds=30 * 24 * 3600, prune_interval=3600.0):
+        """
+        Initialize the pose cache.
+
+        Args:
+            cache_dir (str, optional): Directory for the on-disk tier; None disables it
+            max_memory_entries (int): Maximum number of entries kept in memory
+            max_disk_entries (int): Maximum number of files kept on disk
+            ttl_seconds (float, optional): Entry lifetime; None keeps entries forever
+            prune_interval (float): Seconds between sweeps for expired files while the
+                disk tier is below max_disk_entries
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Guards the disk tier's bookkeeping, so pruning never blocks memory lookups
+        self._disk_lock = threading.Lock()
+        self._disk_count = 0
+        self._last_prune = time.monotonic()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._disk_lock:
+                self._prune_disk()
+
+    def _is_expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key):
+        """
+        Look up a pose description.
+
+        Args:
+            key (str): Cache key from make_cache_key
+
+        Returns:
+            str or None: Cached description, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._is_expired(entry["created"]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry["description"]
+                del self._memory[key]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                entry = None
+
+            if entry is not None:
+                if not self._is_expired(entry["created"]):
+                    with self._lock:
+                        self._remember(key, entry)
+                        self.stats["disk_hits"] += 1
+                    return entry["description"]
+                if self._remove_file(path):
+                    with self._disk_lock:
+                        self._disk_count -= 1
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, description):
+        """
+        Store a pose description in both tiers.
+
+        Args:
+            key (str): Cache key from make_cache_key
+            description (str): Pose description to cache
+        """
+        entry = {"created": time.time(), "description": description}
+        with self._lock:
+            self._remember(key, entry)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(entry, file)
+            with self._disk_lock:
+                is_new = not os.path.exists(path)
+                # Atomic rename so concurrent readers never see a partial file
+                os.replace(tmp_path, path)
+                if is_new:
+                    self._disk_count += 1
+                # A full directory scan only when over the cap or once per interval
+                if (self._disk_count > self.max_disk_entries
+                        or time.monotonic() - self._last_prune > self.prune_interval):
+                    self._prune_disk()
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _prune_disk(self):
+        """
+        Drop expired files, then the oldest files beyond max_disk_entries.
+
+        Pruning goes down to 90% of the cap, so the next scan is not due on the
+        very next put. Called with _disk_lock held.
+        """
+        with os.scandir(self.cache_dir) as entries:
+            files = sorted((entry.stat().st_mtime, entry.path) for entry in entries
+                           if entry.name.endswith(".json"))
+
+        now = time.time()
+        kept = []
+        for mtime, path in files:
+            if self.ttl_seconds is not None and now - mtime > self.ttl_seconds:
+                if self._remove_file(path):
+                    self.stats["evictions"] += 1
+            else:
+                kept.append(path)
+
+        if len(kept) > self.max_disk_entries:
+            excess = len(kept) - int(self.max_disk_entries * 0.9)
+            for path in kept[:excess]:
+                if self._remove_file(path):
+                    self.stats["evictions"] += 1
+            kept = kept[excess:]
+
+        self._disk_count = len(kept)
+        self._last_prune = time.monotonic()
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir:
+            with self._disk_lock:
+                with os.scandir(self.cache_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json"):
+                            self._remove_file(entry.path)
+                self._disk_count = 0
+
+
+class ResultCache:
+    """
+    On-disk blob store for generated images with size-based LRU eviction.
+
+    Each entry is one file named after its key. A hit refreshes the file's
+    mtime, so eviction (oldest mtime first) approximates least recently used.
+    """
+
+    def __init__(self, cache_dir="cache/results", max_bytes=2 * 1024 ** 3):
+        """
+        Initialize the result cache.
+
+        Args:
+            cache_dir (str): Directory holding the cached blobs
+            max_bytes (int): Total size the cache may grow to before evicting
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._list_blobs())
+
+    def _blob_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _list_blobs(self):
+        with os.scandir(self.cache_dir) as entries:
+            blobs = []
+            for entry in entries:
+                if entry.name.endswith(".bin"):
+                    stat = entry.stat()
+                    blobs.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            return blobs
+
+    def get(self, key):
+        """
+        Look up a cached blob.
+
+        Args:
+            key (str): Cache key from make_cache_key
+
+        Returns:
+            bytes or None: Cached data, or None on a miss
+        """
+        path = self._blob_path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.stats["hits"] += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Store a blob, evicting least recently used blobs beyond max_bytes.
+
+        Args:
+            key (str): Cache key from make_cache_key
+            data (bytes): Data to store
+        """
+        path = self._blob_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+
+        with self._lock:
+            try:
+                self._total_bytes -= os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data)
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        blobs = sorted(self._list_blobs())
+        self._total_bytes = sum(size for _, size, _ in blobs)
+        for _, size, path in blobs:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        """Remove every cached blob."""
+        with self._lock:
+            for _, _, path in self._list_blobs():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+import weakref
+
+CLOTHES_DIR = "images/clothes"
+CLOTHES_DESCRIBE_DIR = "images/clothes_describe"
+
+logger = logging.getLogger(__name__)
+
+class ClothesCatalog:
+    """
+    In-memory index of the outfit catalog.
+
+    The directories are scanned once; afterwards lookups are served from the
+    last index without touching the filesystem or taking a lock. A background
+    thread stat()s the files every refresh_interval seconds and swaps in a new
+    index if any image or description was added, removed or changed
+    (including files rewritten in place). Descriptions are re-read only when
+    their file's mtime or size changed.
+    """
+
+    def __init__(self, clothes_dir=CLOTHES_DIR, clothes_describe_dir=CLOTHES_DESCRIBE_DIR, refresh_interval=2.0):
+        """
+        Initialize the catalog, build the index and start watching the files.
+
+        Args:
+            clothes_dir (str): Directory with the outfit PNGs
+            clothes_describe_dir (str): Directory with the description text files
+            refresh_interval (float, optional): Seconds between checks of the files;
+                None (or 0) leaves the index as built until refresh() is called
+        """
+        self.clothes_dir = clothes_dir
+        self.clothes_describe_dir = clothes_describe_dir
+        self.refresh_interval = refresh_interval
+        # Serialises refreshes; readers never take it
+        self._lock = threading.Lock()
+        # (items by name, options sorted by name), replaced as a whole
+        self._index = ({}, [])
+        self._signature = None
+        self._stop = threading.Event()
+        self.refresh(force=True)
+
+        if refresh_interval:
+            # The thread only holds a weak reference, so an unused catalog is
+            # still garbage collected and its watcher exits
+            threading.Thread(target=self._watch, args=(weakref.ref(self), self._stop, refresh_interval),
+                             name="catalog-watcher", daemon=True).start()
+
+    @staticmethod
+    def _watch(catalog_ref, stop, interval):
+        while not stop.wait(interval):
+            catalog = catalog_ref()
+            if catalog is None:
+                return
+            try:
+                catalog.refresh()
+            except Exception as e:
+                logger.warning("Catalog refresh failed: %s", e)
+            del catalog
+
+    def close(self):
+        """Stop watching the files; the current index stays available."""
+        self._stop.set()
+
+    def _read_signature(self):
+        """
+        Stat every outfit image and description.
+
+        Returns:
+            dict or None: Outfit name -> (image entry, image stat key, description entry,
+                description stat key) for outfits with both files; None if a directory is missing
+        """
+        try:
+            with os.scandir(self.clothes_describe_dir) as entries:
+                description_files = {entry.name[:-4]: entry for entry in entries if entry.name.endswith('.txt')}
+            with os.scandir(self.clothes_dir) as entries:
+                image_files = {entry.name[:-4]: entry for entry in entries if entry.name.endswith('.png')}
+        except FileNotFoundError:
+            return None
+
+        signature = {}
+        for clothes_name, image_entry in image_files.items():
+            description_entry = description_files.get(clothes_name)
+            if description_entry is None:
+                continue
+            try:
+                image_stat = image_entry.stat()
+                description_stat = description_entry.stat()
+            except FileNotFoundError:
+                # Removed between the listing and the stat
+                continue
+            signature[clothes_name] = (image_entry, (image_stat.st_mtime_ns, image_stat.st_size),
+                                       description_entry, (description_stat.st_mtime_ns, description_stat.st_size))
+        return signature
+
+    def _scan(self, signature):
+        """Rebuild the index from a signature, reusing unchanged descriptions."""
+        previous_signature = self._signature or {}
+        previous_items = self._index[0]
+        items = {}
+        for clothes_name, (image_entry, image_key, description_entry, description_key) in signature.items():
+            previous = previous_items.get(clothes_name)
+            if previous is not None and previous_signature[clothes_name][3] == description_key:
+                description = previous['description']
+            else:
+                try:
+                    with open(description_entry.path, 'r', encoding='utf-8') as file:
+                        description = file.read().strip()
+                except FileNotFoundError:
+                    continue
+
+            items[clothes_name] = {
+                'name': clothes_name,
+                'image_path': os.path.join(self.clothes_dir, image_entry.name),
+                'description_path': os.path.join(self.clothes_describe_dir, description_entry.name),
+                'description': description,
+                'image_mtime_ns': image_key[0],
+            }
+
+        self._index = (items, [items[name] for name in sorted(items)])
+
+    def refresh(self, force=False):
+        """
+        Re-index the catalog if any of its files changed since the last scan.
+
+        Called by the watcher thread; call it directly to pick up changes at
+        once, or when the catalog was created without a refresh_interval.
+
+        Args:
+            force (bool): Rebuild the index even if no file changed
+
+        Returns:
+            bool: True if the index was rebuilt
+        """
+        with self._lock:
+            signature = self._read_signature() or {}
+            if not force and self._stat_keys(signature) == self._stat_keys(self._signature or {}):
+                return False
+
+            self._scan(signature)
+            self._signature = signature
+            return True
+
+    @staticmethod
+    def _stat_keys(signature):
+        return {name: (image_key, description_key) for name, (_, image_key, _, description_key) in signature.items()}
+
+    def options(self):
+        """
+        List all outfits that have both an image and a description.
+
+        Returns:
+            list[dict]: Outfits sorted by name, each with 'name', 'image_path',
+                'description_path', 'description' and 'image_mtime_ns' keys
+        """
+        return self._index[1]
+
+    def get(self, clothes_id):
+        """
+        Look up one outfit by id (its file name without extension).
+
+        Args:
+            clothes_id (str): Outfit id
+
+        Returns:
+            dict or None: The outfit, or None if it is not in the catalog
+        """
+        return self._index[0].get(clothes_id)
+
+    def description(self, clothes_id):
+        """
+        Return the description text of an outfit.
+
+        Args:
+            clothes_id (str): Outfit id
+
+        Returns:
+            str: Clothes description text
+        """
+        clothes = self.get(clothes_id)
+        if clothes is None:
+            raise KeyError(f"Unknown outfit: {clothes_id}")
+        return clothes['description']
+
+    def __len__(self):
+        return len(self._index[0])
+
+def load_clothes_options(clothes_dir=CLOTHES_DIR, clothes_describe_dir=CLOTHES_DESCRIBE_DIR):
+    """Load available clothes options from the images directory"""
+    return ClothesCatalog(clothes_dir, clothes_describe_dir, refresh_interval=None).options()
@@ -1,33 +1,251 @@
-from google import genai
-from google.genai import types
-from PIL import Image
-from io import BytesIO
-from dotenv import load_dotenv
-load_dotenv("env/.env")
+# python src/clothes_describe.py [--workers 4] [--force] [--prune]
+#
+# Incrementally builds the outfit catalog: every image in images/clothes is
+# hashed, and only new or changed garments are described by the model. The
+# descriptions are written to images/clothes_describe/<name>.txt, which is
+# what catalog.ClothesCatalog (and so the UI) reads, and the grid thumbnails
+# are rendered into the UI's thumbnail cache. The content hashes are kept in
+# cache/clothes_describe.json so the next run knows what changed.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import PIL.Image
-clothes = PIL.Image.open("images/clothes/clothes_2.png")
+from catalog import CLOTHES_DESCRIBE_DIR, CLOTHES_DIR
+from preprocess import ImagePreprocessor
+from thumbnails import THUMBNAIL_CACHE_DIR, THUMBNAIL_SIZE, get_thumbnail_bytes, thumbnail_cache_path
 
-client = genai.Client()
+# Content hashes of the garments described so far; build state, not a catalog
+BUILD_STATE_PATH = "cache/clothes_describe.json"
+DESCRIBE_MODEL = "gemini-2.5-flash"
 
-# Step 1: Analyze the clothes image to describe the pet's clothing
-clothes_description_prompt = """Please analyze these Vietnamese pet clothes in detail. Focus on colors and patterns for each part of the clothing.
+logger = logging.getLogger(__name__)
 
-Note that these clothes are made of silk material. 
+CLOTHES_DESCRIPTION_PROMPT = """Please analyze these Vietnamese pet clothes in detail. Focus on colors and patterns for each part of the clothing.
+
+Note that these clothes are made of silk material.
 
 Provide a detailed description that could be used as a prompt for generating similar clothing in an image. Be specific about the visual elements, colors, textures, and style details."""
 
-clothes_response = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=[clothes_description_prompt, clothes],
-    config=types.GenerateContentConfig(
-        response_modalities=['TEXT'],
-        temperature=0.0,
+
+def file_sha256(path):
+    """
+    Hash a file's bytes.
+
+    Args:
+        path (str): File to hash
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_build_state(state_path=BUILD_STATE_PATH):
+    """
+    Load the build state, or an empty one if it does not exist yet.
+
+    Args:
+        state_path (str): Path to the build state JSON
+
+    Returns:
+        dict: State with an 'items' mapping of outfit name to entry
+    """
+    if not os.path.exists(state_path):
+        return {'version': 2, 'items': {}}
+    with open(state_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    # Atomic rename so the running UI never reads a half-written file
+    os.replace(tmp_path, path)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def describe_clothes(client, image_path, preprocessor=None):
+    """
+    Ask the model for a description of one garment.
+
+    Args:
+        client (genai.Client): Gemini client
+        image_path (str): Path to the clothes image
+        preprocessor (ImagePreprocessor, optional): Downsizes and re-encodes the image
+            before upload, like the generation calls do
+
+    Returns:
+        str: Description suitable for the generation prompt
+    """
+    from google.genai import types
+
+    preprocessor = preprocessor if preprocessor is not None else ImagePreprocessor()
+    clothes = preprocessor.prepare(image_path)
+    clothes_response = client.models.generate_content(
+        model=DESCRIBE_MODEL,
+        contents=[CLOTHES_DESCRIPTION_PROMPT, clothes.part()],
+        config=types.GenerateContentConfig(
+            response_modalities=['TEXT'],
+            temperature=0.0,
+        )
     )
-)
+    return clothes_response.text.strip()
+
+
+def build_catalog(clothes_dir=CLOTHES_DIR, describe_dir=CLOTHES_DESCRIBE_DIR, state_path=BUILD_STATE_PATH,
+                  thumbnail_cache_dir=THUMBNAIL_CACHE_DIR, client=None, max_workers=4, force=False, prune=False):
+    """
+    Bring the descriptions and thumbnails up to date with the clothes directory.
+
+    Unchanged garments (same content hash as in the build state) are skipped.
+    A garment that is not in the state yet but already has a description file
+    adopts that file instead of being re-described, so hand-written
+    descriptions are kept. Removed garments are dropped from the build state
+    and lose their cached thumbnail; their description files are only
+    deleted with prune, since they may be hand-written.
+
+    Args:
+        clothes_dir (str): Directory with the outfit PNGs
+        describe_dir (str): Directory for the description text files
+        state_path (str): Path of the build state JSON
+        thumbnail_cache_dir (str): The UI's thumbnail cache directory, warmed here
+        client (genai.Client, optional): Client for descriptions; created on first need
+        max_workers (int): Maximum parallel description calls
+        force (bool): Re-describe and re-render every garment
+        prune (bool): Also delete the description files of removed garments
+
+    Returns:
+        dict: Counts of 'described', 'thumbnails', 'unchanged' and 'removed' items
+    """
+    os.makedirs(describe_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+
+    state = load_build_state(state_path)
+    old_items = state.get('items', {})
+    items = {}
+    to_describe = []
+    stats = {'described': 0, 'thumbnails': 0, 'unchanged': 0, 'removed': 0}
+
+    for file_name in sorted(os.listdir(clothes_dir)):
+        if not file_name.endswith('.png'):
+            continue
+        name = os.path.splitext(file_name)[0]
+        image_path = os.path.join(clothes_dir, file_name)
+        description_path = os.path.join(describe_dir, f"{name}.txt")
+        image_mtime_ns = os.stat(image_path).st_mtime_ns
+        thumbnail_path = thumbnail_cache_path(image_path, image_mtime_ns, THUMBNAIL_SIZE, thumbnail_cache_dir)
+        sha256 = file_sha256(image_path)
+
+        previous = old_items.get(name)
+        changed = force or previous is None or previous.get('sha256') != sha256
+
+        entry = {
+            'name': name,
+            'image_path': image_path,
+            'sha256': sha256,
+            'image_mtime_ns': image_mtime_ns,
+            'description_path': description_path,
+            'thumbnail_path': thumbnail_path,
+            'updated_at': previous.get('updated_at') if previous else None,
+        }
+        items[name] = entry
+
+        if previous and previous.get('thumbnail_path') not in (None, thumbnail_path):
+            # The image was replaced; its old thumbnail is unreachable now
+            _remove_file(previous['thumbnail_path'])
+        if force:
+            _remove_file(thumbnail_path)
+        if not os.path.exists(thumbnail_path):
+            # Rendering into the UI's cache means the first page load after a
+            # catalog update does not render anything
+            get_thumbnail_bytes(image_path, THUMBNAIL_SIZE, thumbnail_cache_dir, mtime_ns=image_mtime_ns)
+            stats['thumbnails'] += 1
+
+        adopt_existing = previous is None and not force and os.path.exists(description_path)
+        if adopt_existing:
+            entry['updated_at'] = time.time()
+        elif changed or not os.path.exists(description_path):
+            to_describe.append(entry)
+        else:
+            stats['unchanged'] += 1
+
+    for name in set(old_items) - set(items):
+        if prune:
+            _remove_file(old_items[name].get('description_path') or os.path.join(describe_dir, f"{name}.txt"))
+        if old_items[name].get('thumbnail_path'):
+            _remove_file(old_items[name]['thumbnail_path'])
+        stats['removed'] += 1
+
+    if to_describe:
+        if client is None:
+            from dotenv import load_dotenv
+            from google import genai
+            load_dotenv("env/.env")
+            client = genai.Client()
+
+        preprocessor = ImagePreprocessor()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(describe_clothes, client, entry['image_path'], preprocessor): entry
+                       for entry in to_describe}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    description = future.result()
+                except Exception as e:
+                    # Keep the old entry (if any) so the next run retries this garment
+                    logger.warning("Failed to describe %s: %s", entry['name'], e)
+                    if entry['name'] in old_items:
+                        items[entry['name']] = old_items[entry['name']]
+                    else:
+                        del items[entry['name']]
+                    continue
+
+                _write_atomic(entry['description_path'], description)
+                entry['updated_at'] = time.time()
+                stats['described'] += 1
+                logger.info("Described %s", entry['name'])
+
+    state['version'] = 2
+    state['items'] = items
+    _write_atomic(state_path, json.dumps(state, indent=2))
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally describe outfits and render their thumbnails.")
+    parser.add_argument("--clothes-dir", default=CLOTHES_DIR, help="Directory with outfit images")
+    parser.add_argument("--describe-dir", default=CLOTHES_DESCRIBE_DIR, help="Directory for description files")
+    parser.add_argument("--state", default=BUILD_STATE_PATH, help="Path of the build state JSON")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum parallel description calls")
+    parser.add_argument("--force", action="store_true", help="Re-describe every garment")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete the description files of garments no longer in --clothes-dir")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    start = time.perf_counter()
+    stats = build_catalog(args.clothes_dir, args.describe_dir, args.state,
+                          max_workers=args.workers, force=args.force, prune=args.prune)
+    print(f"Catalog updated in {time.perf_counter() - start:.1f}s: "
+          f"{stats['described']} described, {stats['thumbnails']} thumbnails rendered, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+
 
-# Print the generated clothes description
-print("Clothes Description for Image Generation:")
-print("=" * 50)
-print(clothes_response.text)
-print("=" * 50)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+class GenerationEvent:
+    """
+    Base class for the progress events yielded by the streaming generation API
+    (AnimalClothesGenerator.stream_dressed_animal and astream_dressed_animal).
+    """
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items() if name not in ("image", "image_data"))
+        return f"{type(self).__name__}({fields})"
+
+
+class PoseReady(GenerationEvent):
+    """The animal's pose description is available."""
+
+    def __init__(self, description):
+        """
+        Args:
+            description (str): Pose description that goes into the generation prompt
+        """
+        self.description = description
+
+
+class TextChunk(GenerationEvent):
+    """A piece of the image model's text, as soon as it was streamed."""
+
+    def __init__(self, text):
+        """
+        Args:
+            text (str): Newly received text
+        """
+        self.text = text
+
+
+class ImageReady(GenerationEvent):
+    """The generated image has been received and decoded."""
+
+    def __init__(self, image, image_data, cached=False):
+        """
+        Args:
+            image (PIL.Image): Decoded generated image
+            image_data (bytes): Encoded image as returned by the model
+            cached (bool): Whether it came from the result cache instead of the model
+        """
+        self.image = image
+        self.image_data = image_data
+        self.cached = cached
+
+
+class Stored(GenerationEvent):
+    """The generated image has been encoded into a ResultStore (see results.store_results)."""
+
+    def __init__(self, handle, cached=False):
+        """
+        Args:
+            handle (str): ResultStore handle of the encoded image
+            cached (bool): Whether it came from the result cache instead of the model
+        """
+        self.handle = handle
+        self.cached = cached
+
+
+class Saved(GenerationEvent):
+    """The generated image has been written to disk."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Where the image was saved
+        """
+        self.path = path
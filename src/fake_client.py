@@ -0,0 +1,428 @@
+import asyncio
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import httpx
+from google.genai import errors, types
+from PIL import Image
+
+DEFAULT_POSE_TEXT = "A small dog sitting upright, facing the camera, front paws together, tail curled to the left."
+GENERATED_TEXT = "Here is your dressed pet."
+
+# Rough Gemini token accounting: ~4 characters per text token, fixed cost per image
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+GENERATED_IMAGE_TOKENS = 1290
+
+ERROR_STATUSES = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED"}
+
+
+def _placeholder_png(size=(256, 256), color=(200, 120, 160)):
+    """Encode a solid-colour PNG used as the canned generated image."""
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _error_json(code):
+    return {"error": {"code": code, "message": "Injected by the fake Gemini backend",
+                      "status": ERROR_STATUSES.get(code, "UNKNOWN")}}
+
+
+def _http_timeout(config):
+    """Per-request timeout in seconds from a config's http_options, or None."""
+    http_options = getattr(config, "http_options", None)
+    if http_options is None or http_options.timeout is None:
+        return None
+    return http_options.timeout / 1000
+
+
+def _timeout_error(timeout):
+    # What the real client raises when its per-request timeout fires
+    return httpx.ReadTimeout(f"Fake Gemini call outlived its {timeout:.1f}s timeout")
+
+
+def _count_tokens(contents):
+    """Approximate prompt tokens of generate_content contents."""
+    tokens = 0
+    for content in contents:
+        if isinstance(content, str):
+            tokens += len(content) // CHARS_PER_TOKEN
+        elif getattr(content, "inline_data", None) is not None:
+            tokens += IMAGE_TOKENS
+        elif getattr(content, "text", None):
+            tokens += len(content.text) // CHARS_PER_TOKEN
+    return tokens
+
+
+class _FakeBackend:
+    """
+    Latency, jitter and error injection shared by FakeClient and FakeGeminiServer.
+    """
+
+    def __init__(self, latency, pose_text, image_bytes, jitter, error_rate, error_code, seed, model_latency):
+        self.latency = latency
+        self.model_latency = model_latency or {}
+        self.pose_text = pose_text
+        self.image_bytes = image_bytes if image_bytes is not None else _placeholder_png()
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self, model=None):
+        """Seconds the next call takes: the model's (or base) latency plus up to jitter."""
+        with self._lock:
+            latency = self.model_latency.get(model, self.latency)
+            return latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _should_fail(self):
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return True
+            return False
+
+
+class FakeModels:
+    """
+    Stand-in for client.models: returns canned responses after a fixed delay.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        """
+        Sleep for the configured latency and return a canned response.
+
+        Args:
+            model (str): Model name
+            contents (list): Request contents, used for the token counts
+            config (types.GenerateContentConfig, optional): Request config
+
+        Returns:
+            types.GenerateContentResponse: Canned response
+
+        Raises:
+            errors.APIError: For the configured fraction of calls
+            httpx.ReadTimeout: If the latency exceeds the config's http_options timeout
+        """
+        self._client._enter(model)
+        try:
+            delay, timeout = self._client._delay(model), _http_timeout(config)
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise _timeout_error(timeout)
+            time.sleep(delay)
+            self._client._maybe_fail()
+        finally:
+            self._client._exit()
+        return self._client._response(model, contents, config)
+
+    def generate_content_stream(self, model, contents, config=None):
+        """
+        Stream the canned response in chunks, spreading the latency over them.
+
+        Like the real client, nothing is sent until the first chunk is read.
+
+        Args:
+            model (str): Model name
+            contents (list): Request contents, used for the token counts
+            config (types.GenerateContentConfig, optional): Request config
+
+        Yields:
+            types.GenerateContentResponse: Response chunks
+        """
+        chunks = self._client._response_chunks(model, contents, config)
+        self._client._enter(model)
+        try:
+            delay = self._client._delay(model) / len(chunks)
+            for index, chunk in enumerate(chunks):
+                time.sleep(delay)
+                if index == 0:
+                    self._client._maybe_fail()
+                yield chunk
+        finally:
+            self._client._exit()
+
+
+class FakeAsyncModels:
+    """
+    Stand-in for client.aio.models: same canned responses, awaiting the latency.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        """
+        Await the configured latency and return a canned response.
+
+        Args:
+            model (str): Model name
+            contents (list): Request contents, used for the token counts
+            config (types.GenerateContentConfig, optional): Request config
+
+        Returns:
+            types.GenerateContentResponse: Canned response
+
+        Raises:
+            errors.APIError: For the configured fraction of calls
+            httpx.ReadTimeout: If the latency exceeds the config's http_options timeout
+        """
+        self._client._enter(model)
+        try:
+            delay, timeout = self._client._delay(model), _http_timeout(config)
+            if timeout is not None and delay > timeout:
+                await asyncio.sleep(timeout)
+                raise _timeout_error(timeout)
+            await asyncio.sleep(delay)
+            self._client._maybe_fail()
+        finally:
+            self._client._exit()
+        return self._client._response(model, contents, config)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        """
+        Async counterpart of FakeModels.generate_content_stream.
+
+        Returns:
+            AsyncIterator[types.GenerateContentResponse]: Response chunks
+        """
+        chunks = self._client._response_chunks(model, contents, config)
+
+        async def stream():
+            self._client._enter(model)
+            try:
+                delay = self._client._delay(model) / len(chunks)
+                for index, chunk in enumerate(chunks):
+                    await asyncio.sleep(delay)
+                    if index == 0:
+                        self._client._maybe_fail()
+                    yield chunk
+            finally:
+                self._client._exit()
+
+        return stream()
+
+
+class FakeAio:
+    def __init__(self, client):
+        self.models = FakeAsyncModels(client)
+
+
+class FakeClient(_FakeBackend):
+    """
+    Local replacement for genai.Client that never touches the network.
+
+    Pass it as AnimalClothesGenerator(client=FakeClient(...)) to exercise the
+    generation pipeline offline with a controlled amount of latency, jitter
+    and injected API errors.
+    """
+
+    def __init__(self, latency=0.0, pose_text=DEFAULT_POSE_TEXT, image_bytes=None, jitter=0.0,
+                 error_rate=0.0, error_code=503, responses=None, seed=None, model_latency=None,
+                 stream_chunks=4):
+        """
+        Initialize the fake client.
+
+        Args:
+            latency (float): Seconds every call takes
+            pose_text (str): Text returned for text-only requests
+            image_bytes (bytes, optional): PNG returned for image requests
+            jitter (float): Extra delay per call, uniform between 0 and jitter seconds
+            error_rate (float): Fraction of calls that fail with an APIError
+            error_code (int): HTTP status of injected failures, e.g. 429 or 503
+            responses (dict, optional): Canned GenerateContentResponse per model name,
+                returned instead of the built-in text and image responses
+            seed (int, optional): Seed for jitter and error injection, for repeatable runs
+            model_latency (dict, optional): Model name -> latency, overriding latency per model
+            stream_chunks (int): Chunks a streamed response is split into; the image, if
+                any, comes in the last one
+        """
+        super().__init__(latency, pose_text, image_bytes, jitter, error_rate, error_code, seed, model_latency)
+        self.responses = responses or {}
+        self.stream_chunks = stream_chunks
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _enter(self, model):
+        with self._lock:
+            self.calls.append(model)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _response_chunks(self, model, contents, config):
+        """Split a response into streamed chunks: text in pieces, then the image."""
+        response = self._response(model, contents, config)
+        parts = response.candidates[0].content.parts
+        text = "".join(part.text for part in parts if part.text)
+        media = [part for part in parts if part.inline_data is not None]
+
+        pieces = max(1, self.stream_chunks - len(media))
+        words = text.split(" ")
+        step = -(-len(words) // pieces)
+        chunk_parts = [[types.Part(text=" ".join(words[start:start + step]) + " ")]
+                       for start in range(0, len(words), step)]
+        chunk_parts.extend([part] for part in media)
+
+        chunks = [types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=part_list))]
+        ) for part_list in chunk_parts]
+        chunks[-1].usage_metadata = response.usage_metadata
+        return chunks
+
+    def _maybe_fail(self):
+        if not self._should_fail():
+            return
+        if self.error_code >= 500:
+            raise errors.ServerError(self.error_code, _error_json(self.error_code))
+        raise errors.ClientError(self.error_code, _error_json(self.error_code))
+
+    def _response(self, model, contents, config):
+        if model in self.responses:
+            return self.responses[model]
+
+        modalities = (config.response_modalities if config is not None else None) or ["TEXT"]
+        if "IMAGE" in modalities:
+            parts = [
+                types.Part(text=GENERATED_TEXT),
+                types.Part.from_bytes(data=self.image_bytes, mime_type="image/png"),
+            ]
+            output_tokens = len(GENERATED_TEXT) // CHARS_PER_TOKEN + GENERATED_IMAGE_TOKENS
+        else:
+            parts = [types.Part(text=self.pose_text)]
+            output_tokens = len(self.pose_text) // CHARS_PER_TOKEN
+        prompt_tokens = _count_tokens(contents)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+class _FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # One handler instance per TCP connection
+        self.server.fake._connection_opened()
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        fake._request_received(self.path)
+        # Paths look like /v1beta/models/<model>:generateContent
+        model = self.path.rsplit("/", 1)[-1].split(":", 1)[0]
+        time.sleep(fake._delay(model))
+
+        if fake._should_fail():
+            self._send_json(fake.error_code, _error_json(fake.error_code))
+            return
+
+        modalities = (body.get("generationConfig") or {}).get("responseModalities") or ["TEXT"]
+        if "IMAGE" in modalities:
+            parts = [
+                {"text": GENERATED_TEXT},
+                {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(fake.image_bytes).decode("ascii")}},
+            ]
+        else:
+            parts = [{"text": fake.pose_text}]
+        self._send_json(200, {"candidates": [{"content": {"role": "model", "parts": parts}}]})
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGeminiServer(_FakeBackend):
+    """
+    Local HTTP server speaking enough of the Gemini REST API for generate_content.
+
+    Unlike FakeClient it exercises the real genai.Client and its HTTP transport,
+    and counts the TCP connections the client opens, e.g.:
+
+        with FakeGeminiServer() as server:
+            client = create_client(api_key="offline", http_options={"base_url": server.base_url})
+    """
+
+    def __init__(self, latency=0.0, pose_text=DEFAULT_POSE_TEXT, image_bytes=None, jitter=0.0,
+                 error_rate=0.0, error_code=503, seed=None, model_latency=None):
+        """
+        Initialize the fake server (not started yet).
+
+        Args:
+            latency (float): Seconds every request takes
+            pose_text (str): Text returned for text-only requests
+            image_bytes (bytes, optional): PNG returned for image requests
+            jitter (float): Extra delay per request, uniform between 0 and jitter seconds
+            error_rate (float): Fraction of requests answered with an error status
+            error_code (int): HTTP status of injected failures, e.g. 429 or 503
+            seed (int, optional): Seed for jitter and error injection, for repeatable runs
+            model_latency (dict, optional): Model name -> latency, overriding latency per model
+        """
+        super().__init__(latency, pose_text, image_bytes, jitter, error_rate, error_code, seed, model_latency)
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+        self._thread = None
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _request_received(self, path):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGeminiHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
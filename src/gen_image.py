@@ -1,67 +1,582 @@
+import asyncio
+import json
+import logging
 import os
-from google import genai
-from google.genai import types
-from PIL import Image
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from io import BytesIO
-from dotenv import load_dotenv
-import PIL.Image
+
+# google.genai, PIL and dotenv are imported where first needed, keeping them out of the cold start
+from cache import PoseCache, ResultCache, make_cache_key
+from events import ImageReady, PoseReady, Saved, TextChunk
+from metrics import MetricsRecorder, usage_attributes
+from preprocess import ImagePreprocessor, PreparedImage
+from scheduler import DeadlineExceededError, ModelScheduler
+
+POSE_MODEL = "gemini-2.5-flash"
+IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
+
+POSE_ANALYSIS_PROMPT = ("Analyze this image of an animal and provide a detailed description for image generation purposes. This analysis will be used to generate a new image where the animal will be dressed in different clothes while maintaining the exact same pose and position. "
+                        "Please describe in detail: "
+                        "1. The animal's species and breed (if applicable) "
+                        "2. The animal's pose, body position (sitting, standing, lying down, etc.), and visibility of the animal's body parts "
+                        "3. The orientation of the animal's head and body "
+                        "4. The position of the animal's legs, paws/hooves, and tail "
+                        "5. The animal's facial expression and gaze direction "
+                        "6. Any distinctive body language or posture details "
+                        "IMPORTANT: This description will be used to generate a new image where the animal will wear different clothes. Please be extremely specific and detailed about the pose, positioning, body language, visibility, and scale so that the new generated image can maintain the exact same animal pose while only changing the clothing. Go straight to the description without preambles. "
+                        "And as the clothes will be changed, please do not include any details about the animal's current wear, as it will be replaced with new clothes in the generated image.")
+
+# Replaces the analysed pose description in the single-call pipeline, where the
+# image model has to read the pose from the photo itself
+SINGLE_CALL_POSE_INSTRUCTIONS = ("ANIMAL POSE (must be preserved exactly): Study the first image carefully before generating and keep "
+                                 "the animal's species and breed, its pose and body position (sitting, standing, lying down, etc.), "
+                                 "the orientation of its head and body, the position of its legs, paws/hooves and tail, its facial "
+                                 "expression and gaze direction, and its scale and visibility in the frame. Ignore whatever the "
+                                 "animal currently wears. ")
+
+# Pipeline modes: two_call analyses the pose with POSE_MODEL first and puts the
+# description in the prompt; single_call sends one request to IMAGE_MODEL
+PIPELINE_TWO_CALL = "two_call"
+PIPELINE_SINGLE_CALL = "single_call"
+PIPELINES = (PIPELINE_TWO_CALL, PIPELINE_SINGLE_CALL)
+
+# Connection pool shared by all requests of one client; idle connections are
+# kept alive so consecutive generations skip the TCP/TLS handshake
+HTTP_POOL_LIMITS = dict(max_connections=64, max_keepalive_connections=32, keepalive_expiry=120.0)
+
+# Client-side request limits per model; set them to the project's quota so
+# bursts queue up locally instead of coming back as 429s
+MODEL_RATE_LIMITS = {
+    POSE_MODEL: dict(requests_per_minute=1000, burst=50),
+    IMAGE_MODEL: dict(requests_per_minute=100, burst=20),
+}
+
+_shared_generator = None
+_shared_generator_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+def create_client(**client_kwargs):
+    """
+    Create a genai.Client with a pooled keep-alive HTTP transport.
+    
+    Args:
+        **client_kwargs: Extra genai.Client arguments (e.g. api_key, http_options);
+            pool limits are added to http_options unless client_args are already set
+            
+    Returns:
+        genai.Client: Configured client
+    """
+    import httpx
+    from google import genai
+    from google.genai import types
+    
+    http_options = client_kwargs.pop('http_options', None) or types.HttpOptions()
+    if isinstance(http_options, dict):
+        http_options = types.HttpOptions(**http_options)
+    limits = httpx.Limits(**HTTP_POOL_LIMITS)
+    if http_options.client_args is None:
+        http_options.client_args = {'limits': limits}
+    if http_options.async_client_args is None:
+        http_options.async_client_args = {'limits': limits}
+    return genai.Client(http_options=http_options, **client_kwargs)
+
+def get_shared_generator(env_path="env/.env"):
+    """
+    Return the process-wide AnimalClothesGenerator, creating it on first use.
+    
+    The generator and its client are safe to share between threads, so every
+    Streamlit session reuses the same connection pool instead of paying client
+    setup and new TLS connections per request.
+    
+    Args:
+        env_path (str): Path to the environment file containing API keys
+        
+    Returns:
+        AnimalClothesGenerator: Shared generator
+    """
+    global _shared_generator
+    if _shared_generator is None:
+        with _shared_generator_lock:
+            if _shared_generator is None:
+                _shared_generator = AnimalClothesGenerator(env_path)
+    return _shared_generator
 
 class AnimalClothesGenerator:
     """
     A class for generating images of animals dressed in different clothes using Google's Gemini AI.
     """
     
-    def __init__(self, env_path="env/.env"):
+    def __init__(self, env_path="env/.env", pose_cache=None, client=None, preprocessor=None,
+                 result_cache=None, use_result_cache=True, metrics=None, scheduler=None,
+                 pipeline=PIPELINE_TWO_CALL):
         """
         Initialize the AnimalClothesGenerator with API client.
         Args:
             env_path (str): Path to the environment file containing API keys
+            pose_cache (PoseCache, optional): Cache for pose descriptions; a default
+                on-disk cache under cache/pose is used when omitted
+            client (genai.Client, optional): Pre-built client, e.g. a FakeClient for
+                offline runs; a pooled client from create_client is used when omitted
+            preprocessor (ImagePreprocessor, optional): Normalises and re-encodes input
+                images before upload; defaults to WEBP with a 1536px maximum edge
+            result_cache (ResultCache, optional): Store for generated images; a default
+                on-disk cache under cache/results is used when omitted
+            use_result_cache (bool): Set to False to always call the image model
+            metrics (MetricsRecorder, optional): Receives per-stage timing spans; an
+                in-memory histogram is used when omitted
+            scheduler (ModelScheduler, optional): Rate limits and retries model calls;
+                defaults to MODEL_RATE_LIMITS with jittered exponential backoff
+            pipeline (str): Default pipeline mode, one of PIPELINES
         """
-        # Always load from environment file (no API key argument)
-        load_dotenv(env_path)
-        self.client = genai.Client()
+        setup_start = time.perf_counter()
+        # The real client is created on first use, see the client property
+        self.env_path = env_path
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.pose_cache = pose_cache if pose_cache is not None else PoseCache()
+        self.preprocessor = preprocessor if preprocessor is not None else ImagePreprocessor()
+        self.use_result_cache = use_result_cache
+        self.result_cache = None
+        if use_result_cache:
+            self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+        self.scheduler = scheduler if scheduler is not None else ModelScheduler(MODEL_RATE_LIMITS)
+        self.pipeline = self.resolve_pipeline(pipeline)
+        
+        # Pose analyses in flight, so a prefetch and the generations for the
+        # same photo share one model call; they run on the prefetch pool
+        self._pose_futures = {}
+        self._pose_lock = threading.Lock()
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="pose-prefetch")
         
-    def _analyze_animal_pose(self, animal_image_path):
+        self._timing_lock = threading.Lock()
+        self.setup_seconds = time.perf_counter() - setup_start
+        self.request_count = 0
+        self.request_seconds = 0.0
+    
+    @property
+    def client(self):
         """
-        Analyze the animal's pose from the input image.
+        The genai client, created (together with the SDK import) on first access.
+        
+        Returns:
+            genai.Client: The client passed to __init__, or a pooled client from create_client
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from dotenv import load_dotenv
+                    
+                    setup_start = time.perf_counter()
+                    # Always load from environment file (no API key argument)
+                    load_dotenv(self.env_path)
+                    self._client = create_client()
+                    self.setup_seconds += time.perf_counter() - setup_start
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    def _record_request(self, seconds):
+        with self._timing_lock:
+            self.request_count += 1
+            self.request_seconds += seconds
+    
+    def _with_timeout(self, request, timeout):
+        """
+        Copy a request with a per-attempt HTTP timeout.
         
         Args:
-            animal_image_path (str): Path to the animal image
+            request (dict): Arguments for generate_content
+            timeout (float, optional): Seconds left until the deadline; None keeps the request as is
             
         Returns:
-            str: Detailed description of the animal's pose
+            dict: Arguments for generate_content
         """
-        pose_analysis_prompt = ("Analyze this image of an animal and provide a detailed description for image generation purposes. This analysis will be used to generate a new image where the animal will be dressed in different clothes while maintaining the exact same pose and position. "
-                               "Please describe in detail: "
-                               "1. The animal's species and breed (if applicable) "
-                               "2. The animal's pose, body position (sitting, standing, lying down, etc.), and visibility of the animal's body parts "
-                               "3. The orientation of the animal's head and body "
-                               "4. The position of the animal's legs, paws/hooves, and tail "
-                               "5. The animal's facial expression and gaze direction "
-                               "6. Any distinctive body language or posture details "
-                               "IMPORTANT: This description will be used to generate a new image where the animal will wear different clothes. Please be extremely specific and detailed about the pose, positioning, body language, visibility, and scale so that the new generated image can maintain the exact same animal pose while only changing the clothing. Go straight to the description without preambles. "
-                               "And as the clothes will be changed, please do not include any details about the animal's current wear, as it will be replaced with new clothes in the generated image.")
-
-        image = PIL.Image.open(animal_image_path)
+        if timeout is None:
+            return request
+        from google.genai import types
+        
+        http_options = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+        return dict(request, config=request['config'].model_copy(update={'http_options': http_options}))
+    
+    @contextmanager
+    def _timed_model_call(self, request, **attributes):
+        """
+        Time one model call as a model_call span and in the timing_report counters.
+        
+        Args:
+            request (dict): Arguments for generate_content or generate_content_stream
+            **attributes: Extra span attributes, e.g. streamed=True
+        
+        Yields:
+            tuple: (span attributes, time.perf_counter() at the start of the call)
+        """
+        start = time.perf_counter()
+        with self.metrics.span("model_call", model=request['model'], request_bytes=self._request_bytes(request),
+                               **attributes) as span:
+            try:
+                yield span, start
+            finally:
+                self._record_request(time.perf_counter() - start)
+    
+    def _call_model(self, request, deadline=None):
+        """
+        Make a generate_content call through the scheduler, recording how long it took.
+        
+        Args:
+            request (dict): Arguments for generate_content
+            deadline (float, optional): time.monotonic() by which the call must finish
+        
+        Returns:
+            types.GenerateContentResponse: Model response
+        """
+        def send(timeout):
+            return self.client.models.generate_content(**self._with_timeout(request, timeout))
+        
+        with self._timed_model_call(request) as (span, _):
+            response = self.scheduler.call(request['model'], send, deadline)
+            span.update(usage_attributes(response))
+            return response
+    
+    async def _acall_model(self, request, deadline=None):
+        """
+        Async counterpart of _call_model.
+        
+        Args:
+            request (dict): Arguments for generate_content
+            deadline (float, optional): time.monotonic() by which the call must finish
+        
+        Returns:
+            types.GenerateContentResponse: Model response
+        """
+        async def send(timeout):
+            return await self.client.aio.models.generate_content(**self._with_timeout(request, timeout))
+        
+        with self._timed_model_call(request) as (span, _):
+            response = await self.scheduler.acall(request['model'], send, deadline)
+            span.update(usage_attributes(response))
+            return response
+    
+    def _stream_model(self, request, deadline=None):
+        """
+        Make a generate_content_stream call through the scheduler, yielding response chunks.
+        
+        Only opening the stream (up to the first chunk) goes through the retry loop;
+        a failure after chunks were handed out is raised to the caller.
         
-        print("Analyzing animal pose...")
-        pose_response = self.client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[pose_analysis_prompt, image],
+        Args:
+            request (dict): Arguments for generate_content_stream
+            deadline (float, optional): time.monotonic() by which the first chunk must arrive
+        
+        Yields:
+            types.GenerateContentResponse: Response chunks as they arrive
+        """
+        def send(timeout):
+            stream = self.client.models.generate_content_stream(**self._with_timeout(request, timeout))
+            # The request is sent when the first chunk is read, so read it here,
+            # where throttling and transient errors are still retried
+            return next(stream, None), stream
+        
+        with self._timed_model_call(request, streamed=True) as (span, start):
+            chunk, stream = self.scheduler.call(request['model'], send, deadline)
+            span['first_chunk_seconds'] = time.perf_counter() - start
+            last_chunk = chunk
+            if chunk is not None:
+                yield chunk
+                for chunk in stream:
+                    last_chunk = chunk
+                    yield chunk
+            # Usage metadata is complete on the final chunk
+            if last_chunk is not None:
+                span.update(usage_attributes(last_chunk))
+    
+    async def _astream_model(self, request, deadline=None):
+        """
+        Async counterpart of _stream_model.
+        
+        Args:
+            request (dict): Arguments for generate_content_stream
+            deadline (float, optional): time.monotonic() by which the first chunk must arrive
+        
+        Yields:
+            types.GenerateContentResponse: Response chunks as they arrive
+        """
+        async def send(timeout):
+            stream = await self.client.aio.models.generate_content_stream(**self._with_timeout(request, timeout))
+            return await anext(stream, None), stream
+        
+        with self._timed_model_call(request, streamed=True) as (span, start):
+            chunk, stream = await self.scheduler.acall(request['model'], send, deadline)
+            span['first_chunk_seconds'] = time.perf_counter() - start
+            last_chunk = chunk
+            if chunk is not None:
+                yield chunk
+                async for chunk in stream:
+                    last_chunk = chunk
+                    yield chunk
+            if last_chunk is not None:
+                span.update(usage_attributes(last_chunk))
+    
+    def _chunk_parts(self, chunk):
+        """
+        Parts of a streamed response chunk.
+        
+        Args:
+            chunk (types.GenerateContentResponse): One streamed chunk
+        
+        Returns:
+            list[types.Part]: The chunk's parts; empty for chunks without content
+        """
+        if not chunk.candidates or chunk.candidates[0].content is None:
+            return []
+        return chunk.candidates[0].content.parts or []
+    
+    def _read_chunk(self, chunk):
+        """
+        Split a streamed response chunk into progress events and image data.
+        
+        Args:
+            chunk (types.GenerateContentResponse): One streamed chunk
+        
+        Returns:
+            tuple: (list of TextChunk events, encoded image data or None)
+        """
+        events, image_data = [], None
+        for part in self._chunk_parts(chunk):
+            if part.text:
+                events.append(TextChunk(part.text))
+            elif part.inline_data is not None and part.inline_data.data:
+                image_data = part.inline_data.data
+        return events, image_data
+    
+    def _request_bytes(self, request):
+        """
+        Approximate upload size of a request: prompt text plus inline image bytes.
+        
+        Args:
+            request (dict): Arguments for generate_content
+            
+        Returns:
+            int: Payload size in bytes
+        """
+        total = 0
+        for content in request['contents']:
+            if isinstance(content, str):
+                total += len(content.encode('utf-8'))
+            elif content.inline_data is not None:
+                total += len(content.inline_data.data)
+        return total
+    
+    def timing_report(self):
+        """
+        Report one-off setup cost against accumulated model request cost.
+        
+        Returns:
+            dict: setup_seconds, request_count, request_seconds, mean_request_seconds and
+                per-stage latency percentiles under 'stages'
+        """
+        with self._timing_lock:
+            return {
+                'setup_seconds': self.setup_seconds,
+                'request_count': self.request_count,
+                'request_seconds': self.request_seconds,
+                'mean_request_seconds': self.request_seconds / self.request_count if self.request_count else 0.0,
+                'stages': self.metrics.summary(),
+            }
+    
+    def prepare_image(self, source, role):
+        """
+        Prepare an input image for upload, timed as the image_load stage.
+        
+        Args:
+            source: Path, bytes, file-like object, PIL image or PreparedImage
+            role (str): "animal" or "clothes", recorded on the span
+            
+        Returns:
+            PreparedImage: Normalised, encoded image
+        """
+        if isinstance(source, PreparedImage):
+            return source
+        with self.metrics.span("image_load", role=role) as span:
+            image = self.preprocessor.prepare(source)
+            span.update(bytes_before=image.bytes_before, bytes_after=image.bytes_after)
+            return image
+    
+    def resolve_pipeline(self, pipeline):
+        """
+        Pipeline mode a call with this override uses.
+        
+        Args:
+            pipeline (str, optional): One of PIPELINES, or None for the generator's default
+            
+        Returns:
+            str: Pipeline mode
+            
+        Raises:
+            ValueError: For an unknown pipeline
+        """
+        if pipeline is None:
+            return self.pipeline
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown pipeline {pipeline!r}, expected one of {', '.join(PIPELINES)}")
+        return pipeline
+    
+    def _pose_cache_key(self, image):
+        """
+        Build the pose cache key for an image.
+        
+        Args:
+            image (PreparedImage): Animal image
+            
+        Returns:
+            str: Key combining the pixel hash, analysis prompt and model name
+        """
+        return make_cache_key(image.pixel_hash, POSE_ANALYSIS_PROMPT, POSE_MODEL)
+    
+    def _pose_request(self, image):
+        """
+        Build the keyword arguments for the pose analysis call.
+        
+        Args:
+            image (PreparedImage): Animal image
+            
+        Returns:
+            dict: Arguments for generate_content
+        """
+        from google.genai import types
+        
+        return dict(
+            model=POSE_MODEL,
+            contents=[POSE_ANALYSIS_PROMPT, image.part()],
             config=types.GenerateContentConfig(
                 response_modalities=['TEXT'],
                 temperature=0.0,
             )
         )
+    
+    def _pose_from_response(self, pose_response, cache_key):
+        """
+        Extract the pose description from a response and cache it.
         
+        Args:
+            pose_response (types.GenerateContentResponse): Pose analysis response
+            cache_key (str): Key to store the description under
+            
+        Returns:
+            str: Detailed description of the animal's pose
+        """
         animal_pose_description = pose_response.candidates[0].content.parts[0].text
-        print("Animal pose analysis:")
-        print(animal_pose_description)
-        print("\n" + "="*50 + "\n")
+        logger.debug("Animal pose analysis: %s", animal_pose_description)
+        
+        self.pose_cache.put(cache_key, animal_pose_description)
         
         return animal_pose_description
     
-    def _load_clothes_description(self, clothes_description_path):
+    def analyze_pose(self, animal_image, deadline=None):
+        """
+        Analyze the animal's pose from the input image.
+        
+        Args:
+            animal_image (str or PreparedImage): Path to the animal image, or the prepared image
+            deadline (float, optional): time.monotonic() by which the analysis must finish
+        
+        Returns:
+            str: Detailed description of the animal's pose
+        """
+        image = self.prepare_image(animal_image, 'animal')
+        
+        with self.metrics.span("pose_analysis") as span:
+            # The same photo is usually styled in several outfits in a row, so
+            # reuse an earlier analysis of identical pixels when available
+            cache_key = self._pose_cache_key(image)
+            cached_description = self.pose_cache.get(cache_key)
+            span['cache_hit'] = cached_description is not None
+            if cached_description is not None:
+                logger.info("Using cached animal pose analysis")
+                return cached_description
+            
+            future, span['shared'] = self._shared_pose_analysis(image, cache_key)
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait([future], timeout=timeout)
+            if not done:
+                # The analysis keeps running for the other callers and the pose cache
+                raise DeadlineExceededError("Pose analysis did not finish before the deadline")
+            return future.result()
+    
+    def _shared_pose_analysis(self, image, cache_key):
+        """
+        Find the running analysis of a photo, or start one.
+        
+        The analysis runs on the prefetch pool without a deadline, so one
+        caller giving up (its deadline passing, or its task being cancelled)
+        does not fail the others waiting for the same photo; each caller
+        waits with its own deadline instead.
+        
+        Args:
+            image (PreparedImage): Animal image
+            cache_key (str): Pose cache key
+        
+        Returns:
+            tuple: (Future for the description, True if the analysis was already running)
+        """
+        with self._pose_lock:
+            future = self._pose_futures.get(cache_key)
+            if future is not None:
+                return future, True
+            # Submitted under the lock, so the task cannot clear its slot before it is set
+            future = self._pose_futures[cache_key] = self._prefetch_executor.submit(
+                self._run_pose_analysis, image, cache_key)
+            return future, False
+    
+    def _run_pose_analysis(self, image, cache_key):
+        try:
+            # An analysis that finished since the caller's cache lookup
+            cached_description = self.pose_cache.get(cache_key)
+            if cached_description is not None:
+                return cached_description
+            logger.info("Analyzing animal pose...")
+            return self._pose_from_response(self._call_model(self._pose_request(image)), cache_key)
+        finally:
+            with self._pose_lock:
+                del self._pose_futures[cache_key]
+    
+    def prefetch_pose(self, animal_image):
+        """
+        Start analysing an animal's pose in the background, e.g. as soon as a
+        photo is uploaded. A later two-call generation for the same photo then
+        finds the description in the pose cache, or waits for the running call
+        instead of starting a second one.
+        
+        Args:
+            animal_image: Path to the animal image, the image as bytes, a file-like
+                object, a PIL image or a PreparedImage
+        
+        Returns:
+            concurrent.futures.Future: Resolves to the pose description
+        """
+        image = self.prepare_image(animal_image, 'animal')
+        cache_key = self._pose_cache_key(image)
+        cached_description = self.pose_cache.get(cache_key)
+        if cached_description is not None:
+            future = Future()
+            future.set_result(cached_description)
+            return future
+        future, _ = self._shared_pose_analysis(image, cache_key)
+        future.add_done_callback(self._log_prefetch_failure)
+        return future
+    
+    def _log_prefetch_failure(self, future):
+        # Nobody may ever wait for a prefetch; the generation retries on its own
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Pose prefetch failed: %s", future.exception())
+    
+    def load_clothes_description(self, clothes_description_path):
         """
         Load clothes description from a text file.
         
@@ -74,102 +589,593 @@ class AnimalClothesGenerator:
         if not os.path.exists(clothes_description_path):
             raise FileNotFoundError(f"Clothes description file not found: {clothes_description_path}")
         
-        with open(clothes_description_path, 'r', encoding='utf-8') as file:
-            return file.read().strip()
+        with self.metrics.span("description_load") as span:
+            with open(clothes_description_path, 'r', encoding='utf-8') as file:
+                clothes_description = file.read().strip()
+            span['description_chars'] = len(clothes_description)
+            return clothes_description
     
     def _create_generation_prompt(self, animal_pose_description, clothes_description):
         """
         Create the final prompt for image generation.
         
         Args:
-            animal_pose_description (str): Description of the animal's pose
+            animal_pose_description (str): Description of the animal's pose; None for the
+                single-call pipeline, which asks the image model to keep the pose itself
             clothes_description (str): Description of the clothes
             
         Returns:
             str: Complete prompt for image generation
         """
-        return ("Create a photorealistic image using the provided reference images. The first image shows the animal that should be dressed, and the second image shows the clothes to be added. "
-                "TASK: Dress the animal from the first image with the clothes from the second image. "
-                f"ANIMAL POSE DETAILS (must be preserved exactly): {animal_pose_description} "
-                f"CLOTHES DETAILS (must be replicated exactly): {clothes_description} "
-                "IMPORTANT REQUIREMENTS: "
-                "- Keep the exact same animal pose, body shape, and facial expression from the first image "
-                "- Maintain the specific pose details described above "
-                "- Only modify the animal by adding/changing the clothes to match the reference clothing from the second image "
-                "- Replicate the exact texture, pattern, color, and fabric details described in the clothes analysis "
-                "- Ensure the clothes fit naturally on the animal's body without altering the animal's anatomy "
-                "- Clothes should appear realistically on the animal's body, adapting to the animal's specific body structure "
-                "- Keep all other elements (background, foreground, lighting, animal's position) identical to the original first image")
-    
-    def generate_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path, 
-                              show_image=True, save_path=None):
+        if animal_pose_description is None:
+            pose_details = SINGLE_CALL_POSE_INSTRUCTIONS
+        else:
+            pose_details = f"ANIMAL POSE DETAILS (must be preserved exactly): {animal_pose_description} "
+        
+        with self.metrics.span("prompt_build") as span:
+            prompt = ("Create a photorealistic image using the provided reference images. The first image shows the animal that should be dressed, and the second image shows the clothes to be added. "
+                      "TASK: Dress the animal from the first image with the clothes from the second image. "
+                      f"{pose_details}"
+                      f"CLOTHES DETAILS (must be replicated exactly): {clothes_description} "
+                      "IMPORTANT REQUIREMENTS: "
+                      "- Keep the exact same animal pose, body shape, and facial expression from the first image "
+                      "- Maintain the specific pose details described above "
+                      "- Only modify the animal by adding/changing the clothes to match the reference clothing from the second image "
+                      "- Replicate the exact texture, pattern, color, and fabric details described in the clothes analysis "
+                      "- Ensure the clothes fit naturally on the animal's body without altering the animal's anatomy "
+                      "- Clothes should appear realistically on the animal's body, adapting to the animal's specific body structure "
+                      "- Keep all other elements (background, foreground, lighting, animal's position) identical to the original first image")
+            span['prompt_chars'] = len(prompt)
+            return prompt
+    
+    def _validate_inputs(self, animal_image_path, clothes_image_path):
         """
-        Generate an image of an animal dressed in specified clothes.
+        Check that input images given as file paths exist.
         
         Args:
-            animal_image_path (str): Path to the animal image
-            clothes_image_path (str): Path to the clothes image
-            clothes_description_path (str): Path to the text file containing clothes description
-            show_image (bool): Whether to display the generated image
-            save_path (str, optional): Path to save the generated image
-            
-        Returns:
-            PIL.Image: Generated image object
+            animal_image_path: Path to the animal image, or an in-memory image
+            clothes_image_path: Path to the clothes image, or an in-memory image
         """
-        # Validate input files
-        if not os.path.exists(animal_image_path):
+        if isinstance(animal_image_path, (str, os.PathLike)) and not os.path.exists(animal_image_path):
             raise FileNotFoundError(f"Animal image not found: {animal_image_path}")
-        if not os.path.exists(clothes_image_path):
+        if isinstance(clothes_image_path, (str, os.PathLike)) and not os.path.exists(clothes_image_path):
             raise FileNotFoundError(f"Clothes image not found: {clothes_image_path}")
+    
+    def _generation_request(self, text_input, animal_image, clothes_image):
+        """
+        Build the keyword arguments for the image generation call.
         
-        # Load images
-        animal_image = PIL.Image.open(animal_image_path)
-        clothes_image = PIL.Image.open(clothes_image_path)
-        
-        # Analyze animal pose
-        animal_pose_description = self._analyze_animal_pose(animal_image_path)
-        
-        # Load clothes description
-        clothes_description = self._load_clothes_description(clothes_description_path)
-        
-        # Create generation prompt
-        text_input = self._create_generation_prompt(animal_pose_description, clothes_description)
+        Args:
+            text_input (str): Generation prompt
+            animal_image (PreparedImage): Animal image
+            clothes_image (PreparedImage): Clothes image
+            
+        Returns:
+            dict: Arguments for generate_content
+        """
+        logger.info("Generating image with enhanced prompt...")
+        logger.debug("Final prompt: %s", text_input)
         
-        print("Generating image with enhanced prompt...")
-        print("Final prompt:")
-        print(text_input)
-        print("\n" + "="*50 + "\n")
+        from google.genai import types
         
-        # Generate image
-        response = self.client.models.generate_content(
-            model="gemini-2.0-flash-preview-image-generation",
-            contents=[text_input, animal_image, clothes_image],
+        return dict(
+            model=IMAGE_MODEL,
+            contents=[text_input, animal_image.part(), clothes_image.part()],
             config=types.GenerateContentConfig(
                 response_modalities=['TEXT', 'IMAGE'],
                 temperature=0.0,
             )
         )
+    
+    def _image_data_from_response(self, response):
+        """
+        Extract the encoded generated image from a generation response.
         
-        generated_image = None
+        Args:
+            response (types.GenerateContentResponse): Image generation response
+            
+        Returns:
+            bytes: Encoded image data, or None if the response has no image
+        """
+        image_data = None
         
         for part in response.candidates[0].content.parts:
             if part.text is not None:
-                print(part.text)
+                logger.debug("Model text: %s", part.text)
             elif part.inline_data is not None:
-                generated_image = Image.open(BytesIO((part.inline_data.data)))
-                
-                if show_image:
-                    generated_image.show()
-                
-                if save_path:
-                    generated_image.save(save_path)
-                    print(f"Image saved to: {save_path}")
+                image_data = part.inline_data.data
+        
+        return image_data
+    
+    def _open_generated_image(self, image_data, show_image=False, save_path=None):
+        """
+        Decode a generated image, then optionally show and save it.
+        
+        Args:
+            image_data (bytes): Encoded image data, or None
+            show_image (bool): Whether to display the generated image
+            save_path (str, optional): Path to save the generated image
+            
+        Returns:
+            PIL.Image: Generated image object, or None if there is no image data
+        """
+        if image_data is None:
+            return None
+        
+        generated_image = self._decode_generated_image(image_data)
+        
+        if show_image:
+            generated_image.show()
+        
+        if save_path:
+            self._save_generated_image(generated_image, save_path, image_data)
         
         return generated_image
-
+    
+    def _decode_generated_image(self, image_data):
+        """
+        Decode a generated image, timed as the response_decode stage.
+        
+        Args:
+            image_data (bytes): Encoded image data
+            
+        Returns:
+            PIL.Image: Decoded image
+        """
+        from PIL import Image
+        
+        with self.metrics.span("response_decode", response_bytes=len(image_data)):
+            generated_image = Image.open(BytesIO(image_data))
+            generated_image.load()
+        return generated_image
+    
+    def _save_generated_image(self, generated_image, save_path, image_data=None):
+        """
+        Save a generated image, timed as the save stage.
+        
+        When save_path asks for the format the model already returned, the
+        model's bytes are written as they are instead of being re-encoded.
+        
+        Args:
+            generated_image (PIL.Image): Decoded generated image
+            save_path (str): Path to save the image; its extension selects the format
+            image_data (bytes, optional): Encoded image as returned by the model
+        """
+        from PIL import Image
+        
+        extension = os.path.splitext(save_path)[1].lower()
+        with self.metrics.span("save") as span:
+            if image_data is not None and Image.registered_extensions().get(extension) == generated_image.format:
+                span["reencoded"] = False
+                with open(save_path, "wb") as file:
+                    file.write(image_data)
+            else:
+                span["reencoded"] = True
+                generated_image.save(save_path)
+        logger.info("Image saved to: %s", save_path)
+    
+    def _image_from_response(self, response, show_image=False, save_path=None):
+        """
+        Decode the generated image from a generation response.
+        
+        Args:
+            response (types.GenerateContentResponse): Image generation response
+            show_image (bool): Whether to display the generated image
+            save_path (str, optional): Path to save the generated image
+            
+        Returns:
+            PIL.Image: Generated image object, or None if the response has no image
+        """
+        return self._open_generated_image(self._image_data_from_response(response), show_image, save_path)
+    
+    def _result_cache_key(self, animal_image, clothes_image, clothes_description, text_input):
+        """
+        Build the result cache key for one generation.
+        
+        Args:
+            animal_image (PreparedImage): Animal image
+            clothes_image (PreparedImage): Clothes image
+            clothes_description (str): Description of the clothes
+            text_input (str): Generation prompt
+            
+        Returns:
+            str: Key over both image hashes, the description, the prompt and the model name
+        """
+        return make_cache_key(animal_image.pixel_hash, clothes_image.pixel_hash, clothes_description,
+                              text_input, IMAGE_MODEL)
+    
+    def _result_cache_enabled(self, use_result_cache):
+        if use_result_cache is None:
+            use_result_cache = self.use_result_cache
+        return use_result_cache and self.result_cache is not None
+    
+    def _begin_generation(self, animal_image_path, clothes_image_path, timeout, pipeline):
+        """
+        First steps of every generation variant: deadline, pipeline, input checks
+        and the animal image, which both model calls use.
+        
+        Args:
+            animal_image_path: Path to the animal image, or an in-memory image
+            clothes_image_path: Path to the clothes image, or an in-memory image
+            timeout (float, optional): Seconds both model calls may take together
+            pipeline (str, optional): Override the generator's pipeline mode
+        
+        Returns:
+            tuple: (deadline or None, pipeline mode, PreparedImage of the animal)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pipeline = self.resolve_pipeline(pipeline)
+        self._validate_inputs(animal_image_path, clothes_image_path)
+        # Load, normalise and encode the animal image once for both model calls
+        return deadline, pipeline, self.prepare_image(animal_image_path, 'animal')
+    
+    def _before_generation(self, animal_image, animal_pose_description, clothes_image_path,
+                           clothes_description_path, clothes_description=None, use_result_cache=None):
+        """
+        Steps between the pose and the image model call, shared by every generation
+        variant: prepare the clothes image, load the description, build the prompt
+        and look up the result cache.
+        
+        Args:
+            animal_image (PreparedImage): Animal image
+            animal_pose_description (str): Description of the animal's pose, None for the
+                single-call pipeline
+            clothes_image_path: Path to the clothes image, or an in-memory image
+            clothes_description_path (str): Path to the text file containing clothes description
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+        
+        Returns:
+            tuple: (request for the image model, None on a result cache hit;
+                result cache key, None when the cache is off; cached encoded image or None)
+        """
+        clothes_image = self.prepare_image(clothes_image_path, 'clothes')
+        if clothes_description is None:
+            clothes_description = self.load_clothes_description(clothes_description_path)
+        text_input = self._create_generation_prompt(animal_pose_description, clothes_description)
+        
+        # Identical inputs at temperature 0 give the same result, so reuse it
+        result_key = None
+        if self._result_cache_enabled(use_result_cache):
+            result_key = self._result_cache_key(animal_image, clothes_image, clothes_description, text_input)
+            cached_image_data = self.result_cache.get(result_key)
+            if cached_image_data is not None:
+                logger.info("Using cached generated image")
+                return None, result_key, cached_image_data
+        
+        return self._generation_request(text_input, animal_image, clothes_image), result_key, None
+    
+    def _store_result(self, result_key, image_data):
+        if result_key is not None and image_data is not None:
+            self.result_cache.put(result_key, image_data)
+    
+    def generate_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path,
+                              show_image=True, save_path=None, clothes_description=None, use_result_cache=None,
+                              timeout=None, pipeline=None):
+        """
+        Generate an image of an animal dressed in specified clothes.
+        
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object or a PIL image
+            clothes_image_path (str): Path to the clothes image
+            clothes_description_path (str): Path to the text file containing clothes description
+            show_image (bool): Whether to display the generated image
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text (e.g. from
+                a ClothesCatalog); clothes_description_path is not read when given
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            timeout (float, optional): Seconds both model calls (including queueing and
+                retries) may take together; None waits as long as retries allow
+            pipeline (str, optional): Override the generator's pipeline mode; single_call
+                skips the pose analysis round-trip
+        
+        Returns:
+            PIL.Image: Generated image object
+        
+        Raises:
+            scheduler.SchedulerError: If the model is unavailable or the timeout passes
+            errors.APIError: If the model keeps failing after retries
+        """
+        deadline, pipeline, animal_image = self._begin_generation(animal_image_path, clothes_image_path,
+                                                                  timeout, pipeline)
+        animal_pose_description = None
+        if pipeline == PIPELINE_TWO_CALL:
+            animal_pose_description = self.analyze_pose(animal_image, deadline)
+        
+        return self.dress(animal_image, animal_pose_description, clothes_image_path, clothes_description_path,
+                          show_image, save_path, clothes_description, use_result_cache, deadline)
+    
+    def dress(self, animal_image, animal_pose_description, clothes_image_path, clothes_description_path=None,
+              show_image=False, save_path=None, clothes_description=None, use_result_cache=None, deadline=None):
+        """
+        Run the image generation step for an already analysed animal.
+        
+        Callers dressing the same animal in many outfits (or many animals in the
+        same outfits) prepare the images with prepare_image, the pose with
+        analyze_pose and the descriptions with load_clothes_description once, and
+        pass them here for every combination.
+        
+        Args:
+            animal_image (PreparedImage): Animal image
+            animal_pose_description (str): Description of the animal's pose, None for the
+                single-call pipeline
+            clothes_image_path: Path to the clothes image, or its PreparedImage
+            clothes_description_path (str, optional): Path to the text file containing clothes
+                description; not read when clothes_description is given
+            show_image (bool): Whether to display the generated image
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            deadline (float, optional): time.monotonic() by which the model call must finish
+        
+        Returns:
+            PIL.Image: Generated image object, or None if the response contained no image
+        """
+        request, result_key, image_data = self._before_generation(
+            animal_image, animal_pose_description, clothes_image_path, clothes_description_path,
+            clothes_description, use_result_cache)
+        if request is not None:
+            image_data = self._image_data_from_response(self._call_model(request, deadline))
+            self._store_result(result_key, image_data)
+        
+        return self._open_generated_image(image_data, show_image, save_path)
+    
+    def stream_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path,
+                              save_path=None, clothes_description=None, use_result_cache=None, timeout=None,
+                              pipeline=None):
+        """
+        Streaming counterpart of generate_dressed_animal: yields progress events
+        while the generation runs instead of returning only the final image.
+        
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object, a PIL image or a PreparedImage
+            clothes_image_path (str): Path to the clothes image
+            clothes_description_path (str): Path to the text file containing clothes description
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            timeout (float, optional): Seconds both model calls may take together
+            pipeline (str, optional): Override the generator's pipeline mode
+        
+        Yields:
+            GenerationEvent: PoseReady (two-call pipeline only), TextChunk for model text as
+                it arrives, ImageReady once the image is decoded, and Saved if save_path is given
+        """
+        deadline, pipeline, animal_image = self._begin_generation(animal_image_path, clothes_image_path,
+                                                                  timeout, pipeline)
+        animal_pose_description = None
+        if pipeline == PIPELINE_TWO_CALL:
+            animal_pose_description = self.analyze_pose(animal_image, deadline)
+            yield PoseReady(animal_pose_description)
+        
+        request, result_key, image_data = self._before_generation(
+            animal_image, animal_pose_description, clothes_image_path, clothes_description_path,
+            clothes_description, use_result_cache)
+        if request is not None:
+            for chunk in self._stream_model(request, deadline):
+                events, chunk_image_data = self._read_chunk(chunk)
+                yield from events
+                image_data = chunk_image_data or image_data
+            if image_data is None:
+                logger.warning("Model response contained no image")
+                return
+            self._store_result(result_key, image_data)
+        
+        generated_image = self._decode_generated_image(image_data)
+        yield ImageReady(generated_image, image_data, cached=request is None)
+        
+        if save_path:
+            self._save_generated_image(generated_image, save_path, image_data)
+            yield Saved(save_path)
+    
+    def generate_wardrobe(self, animal_image_path, clothes_options, output_dir, max_workers=None, pipeline=None):
+        """
+        Dress one animal in every outfit, yielding results as they finish.
+        
+        The pose is analysed once up front; the image generation calls then all
+        run in parallel on a thread pool (up to the image model's burst), so the
+        whole wardrobe takes roughly as long as the slowest single call. A manifest.json with per-item latency is
+        written to output_dir once all items are done (or the caller stops early).
+        
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object or a PIL image
+            clothes_options (list[dict]): Outfits with 'name', 'image_path' and
+                'description_path' keys, as returned by catalog.load_clothes_options
+            output_dir (str): Directory for the generated images and the manifest
+            max_workers (int, optional): Maximum number of generation calls in flight;
+                defaults to one per outfit, capped by the image model's burst
+            pipeline (str, optional): Override the generator's pipeline mode
+            
+        Yields:
+            dict: Manifest entry for each finished outfit
+        """
+        if isinstance(animal_image_path, (str, os.PathLike)) and not os.path.exists(animal_image_path):
+            raise FileNotFoundError(f"Animal image not found: {animal_image_path}")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        start = time.perf_counter()
+        # Encode once up front; worker threads share the same bytes
+        animal_image = self.prepare_image(animal_image_path, 'animal')
+        animal_pose_description = None
+        if self.resolve_pipeline(pipeline) == PIPELINE_TWO_CALL:
+            animal_pose_description = self.analyze_pose(animal_image)
+        pose_seconds = time.perf_counter() - start
+        
+        def dress(clothes):
+            item_start = time.perf_counter()
+            output_path = os.path.join(output_dir, f"{clothes['name']}.png")
+            entry = {
+                'name': clothes['name'],
+                'clothes_image_path': clothes['image_path'],
+                'output_path': None,
+                'status': 'ok',
+                'error': None,
+            }
+            try:
+                self._validate_inputs(animal_image_path, clothes['image_path'])
+                generated_image = self.dress(animal_image, animal_pose_description, clothes['image_path'],
+                                             clothes['description_path'], save_path=output_path,
+                                             clothes_description=clothes.get('description'))
+                if generated_image is None:
+                    entry['status'] = 'error'
+                    entry['error'] = "Model response contained no image"
+                else:
+                    entry['output_path'] = output_path
+            except Exception as e:
+                entry['status'] = 'error'
+                entry['error'] = str(e)
+            entry['latency_seconds'] = round(time.perf_counter() - item_start, 3)
+            return entry
+        
+        if max_workers is None:
+            max_workers = min(len(clothes_options), MODEL_RATE_LIMITS[IMAGE_MODEL]['burst'])
+        items = []
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        try:
+            futures = [executor.submit(dress, clothes) for clothes in clothes_options]
+            for future in as_completed(futures):
+                entry = future.result()
+                items.append(entry)
+                yield entry
+        finally:
+            # Drop queued outfits if the caller stopped consuming early
+            executor.shutdown(wait=True, cancel_futures=True)
+            manifest = {
+                'animal_image_path': animal_image_path if isinstance(animal_image_path, str) else None,
+                'pose_seconds': round(pose_seconds, 3),
+                'total_seconds': round(time.perf_counter() - start, 3),
+                'items': items,
+            }
+            with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as file:
+                json.dump(manifest, file, indent=2)
+    
+    async def aanalyze_pose(self, animal_image, deadline=None):
+        """
+        Async counterpart of analyze_pose, waiting for the shared analysis
+        without blocking the event loop.
+        
+        Args:
+            animal_image (str or PreparedImage): Path to the animal image, or the prepared image
+            deadline (float, optional): time.monotonic() by which the analysis must finish
+            
+        Returns:
+            str: Detailed description of the animal's pose
+        """
+        # Decoding and encoding are CPU/disk bound, keep them off the event loop
+        image = await asyncio.to_thread(self.prepare_image, animal_image, 'animal')
+        
+        with self.metrics.span("pose_analysis") as span:
+            cache_key = self._pose_cache_key(image)
+            cached_description = await asyncio.to_thread(self.pose_cache.get, cache_key)
+            span['cache_hit'] = cached_description is not None
+            if cached_description is not None:
+                logger.info("Using cached animal pose analysis")
+                return cached_description
+            
+            future, span['shared'] = self._shared_pose_analysis(image, cache_key)
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            # asyncio.wait never cancels what it waits on, so cancelling this
+            # task leaves the shared analysis running for the other callers
+            waiter = asyncio.wrap_future(future)
+            done, _ = await asyncio.wait({waiter}, timeout=timeout)
+            if not done:
+                raise DeadlineExceededError("Pose analysis did not finish before the deadline")
+            return waiter.result()
+    
+    async def agenerate_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path,
+                                       save_path=None, clothes_description=None, use_result_cache=None,
+                                       timeout=None, pipeline=None):
+        """
+        Async counterpart of generate_dressed_animal.
+        
+        The image model call goes through the client's aio interface, and file and
+        image work runs in threads, so many generations can be in flight on one
+        event loop. The generated image is never shown.
+        
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object or a PIL image
+            clothes_image_path (str): Path to the clothes image
+            clothes_description_path (str): Path to the text file containing clothes description
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            timeout (float, optional): Seconds both model calls may take together
+            pipeline (str, optional): Override the generator's pipeline mode
+        
+        Returns:
+            PIL.Image: Generated image object
+        """
+        deadline, pipeline, animal_image = await asyncio.to_thread(
+            self._begin_generation, animal_image_path, clothes_image_path, timeout, pipeline)
+        animal_pose_description = None
+        if pipeline == PIPELINE_TWO_CALL:
+            animal_pose_description = await self.aanalyze_pose(animal_image, deadline)
+        
+        request, result_key, image_data = await asyncio.to_thread(
+            self._before_generation, animal_image, animal_pose_description, clothes_image_path,
+            clothes_description_path, clothes_description, use_result_cache)
+        if request is not None:
+            image_data = self._image_data_from_response(await self._acall_model(request, deadline))
+            await asyncio.to_thread(self._store_result, result_key, image_data)
+        
+        return await asyncio.to_thread(self._open_generated_image, image_data, False, save_path)
+    
+    async def astream_dressed_animal(self, animal_image_path, clothes_image_path, clothes_description_path,
+                                     save_path=None, clothes_description=None, use_result_cache=None,
+                                     timeout=None, pipeline=None):
+        """
+        Async counterpart of stream_dressed_animal.
+        
+        Args:
+            animal_image_path: Path to the animal image, or the image as bytes, a file-like
+                object, a PIL image or a PreparedImage
+            clothes_image_path (str): Path to the clothes image
+            clothes_description_path (str): Path to the text file containing clothes description
+            save_path (str, optional): Path to save the generated image
+            clothes_description (str, optional): Already loaded description text
+            use_result_cache (bool, optional): Override the generator's use_result_cache setting
+            timeout (float, optional): Seconds both model calls may take together
+            pipeline (str, optional): Override the generator's pipeline mode
+        
+        Yields:
+            GenerationEvent: Same events as stream_dressed_animal
+        """
+        deadline, pipeline, animal_image = await asyncio.to_thread(
+            self._begin_generation, animal_image_path, clothes_image_path, timeout, pipeline)
+        animal_pose_description = None
+        if pipeline == PIPELINE_TWO_CALL:
+            animal_pose_description = await self.aanalyze_pose(animal_image, deadline)
+            yield PoseReady(animal_pose_description)
+        
+        request, result_key, image_data = await asyncio.to_thread(
+            self._before_generation, animal_image, animal_pose_description, clothes_image_path,
+            clothes_description_path, clothes_description, use_result_cache)
+        if request is not None:
+            async for chunk in self._astream_model(request, deadline):
+                events, chunk_image_data = self._read_chunk(chunk)
+                for event in events:
+                    yield event
+                image_data = chunk_image_data or image_data
+            if image_data is None:
+                logger.warning("Model response contained no image")
+                return
+            await asyncio.to_thread(self._store_result, result_key, image_data)
+        
+        generated_image = await asyncio.to_thread(self._decode_generated_image, image_data)
+        yield ImageReady(generated_image, image_data, cached=request is None)
+        
+        if save_path:
+            await asyncio.to_thread(self._save_generated_image, generated_image, save_path, image_data)
+            yield Saved(save_path)
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    
     # Create generator instance
     generator = AnimalClothesGenerator()
     
@@ -180,4 +1186,4 @@ if __name__ == "__main__":
         clothes_description_path="images/clothes_describe/clothes_1.txt",
         show_image=True,
         save_path="animal_with_clothes_1.png"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,236 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity and cannot admit another job."""
+
+
+class SessionLimitError(QueueFullError):
+    """Raised when a session already has its maximum number of active jobs."""
+
+
+class Job:
+    """
+    State of one submitted job. Read it through JobQueue.get; the worker
+    thread updates it in place.
+    """
+
+    def __init__(self, job_id, session_id):
+        self.id = job_id
+        self.session_id = session_id
+        self.status = QUEUED
+        self.result = None
+        self.events = []
+        self.error = None
+        self.traceback = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def queue_seconds(self):
+        return (self.started_at or time.time()) - self.submitted_at
+
+    @property
+    def run_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobQueue:
+    """
+    Runs jobs on a bounded worker pool so callers (e.g. Streamlit scripts)
+    get a job id back immediately and poll for the result.
+
+    Admission control keeps at most max_workers running plus max_queued
+    waiting jobs, and at most per_session_limit active jobs per session.
+    """
+
+    def __init__(self, max_workers=4, max_queued=32, per_session_limit=2, keep_finished_seconds=900):
+        """
+        Initialize the job queue.
+
+        Args:
+            max_workers (int): Jobs that run at the same time
+            max_queued (int): Jobs that may wait for a free worker
+            per_session_limit (int): Active (queued or running) jobs allowed per session
+            keep_finished_seconds (float): How long finished jobs stay retrievable
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.per_session_limit = per_session_limit
+        self.keep_finished_seconds = keep_finished_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.keep_finished_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if not job.active and job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, job, fn, args, kwargs, stream):
+        with self._lock:
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            if stream:
+                result = None
+                for event in fn(*args, **kwargs):
+                    with self._lock:
+                        job.events.append(event)
+                    result = event
+            else:
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job.error = e
+                job.traceback = traceback.format_exc()
+                job.status = FAILED
+                job.finished_at = time.time()
+        else:
+            with self._lock:
+                job.result = result
+                job.status = DONE
+                job.finished_at = time.time()
+
+    def submit(self, session_id, fn, *args, **kwargs):
+        """
+        Queue a job.
+
+        Args:
+            session_id (str): Identifies the submitting session for the per-session limit
+            fn (callable): Work to run on a worker thread
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            str: Job id to poll with get
+
+        Raises:
+            SessionLimitError: If the session already has per_session_limit active jobs
+            QueueFullError: If all workers are busy and the wait queue is full
+        """
+        return self._submit(session_id, fn, args, kwargs, stream=False)
+
+    def submit_stream(self, session_id, fn, *args, **kwargs):
+        """
+        Queue a job whose fn yields progress events.
+
+        Each event is appended to Job.events as soon as it is yielded, so pollers
+        can render progress before the job finishes; the last event becomes
+        Job.result.
+
+        Args:
+            session_id (str): Identifies the submitting session for the per-session limit
+            fn (callable): Generator function to run on a worker thread
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            str: Job id to poll with get
+
+        Raises:
+            SessionLimitError: If the session already has per_session_limit active jobs
+            QueueFullError: If all workers are busy and the wait queue is full
+        """
+        return self._submit(session_id, fn, args, kwargs, stream=True)
+
+    def _submit(self, session_id, fn, args, kwargs, stream):
+        with self._lock:
+            self._purge_finished()
+            active = [job for job in self._jobs.values() if job.active]
+            if sum(1 for job in active if job.session_id == session_id) >= self.per_session_limit:
+                raise SessionLimitError(
+                    f"Session already has {self.per_session_limit} job(s) in progress")
+            if len(active) >= self.max_workers + self.max_queued:
+                raise QueueFullError("Too many requests in progress, please try again shortly")
+
+            job = Job(uuid.uuid4().hex, session_id)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs, stream)
+            return job.id
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Id returned by submit
+
+        Returns:
+            Job or None: The job, or None if it is unknown or was purged
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job that has not started yet.
+
+        Args:
+            job_id (str): Id returned by submit
+
+        Returns:
+            bool: True if the job was cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.future.cancel()
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+
+    def stats(self):
+        """
+        Summarise the queue.
+
+        Returns:
+            dict: Number of jobs per status plus the configured limits
+        """
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts.update(max_workers=self.max_workers, max_queued=self.max_queued)
+            return counts
+
+    def position(self, job_id):
+        """
+        Number of queued jobs submitted before this one.
+
+        Args:
+            job_id (str): Id returned by submit
+
+        Returns:
+            int: Jobs ahead in the queue, 0 if the job is running or finished
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            return sum(1 for other in self._jobs.values()
+                       if other.status == QUEUED and other.submitted_at < job.submitted_at)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,349 @@
+# python src/matrix.py images/animals --output-dir output/matrix
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache import make_cache_key
+from catalog import CLOTHES_DESCRIBE_DIR, CLOTHES_DIR, load_clothes_options
+from gen_image import IMAGE_MODEL, PIPELINE_TWO_CALL, AnimalClothesGenerator
+from thumbnails import make_thumbnail
+
+PET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+CONTACT_SHEET_CELL_SIZE = (256, 256)
+CONTACT_SHEET_LABEL_WIDTH = 160
+CONTACT_SHEET_LABEL_HEIGHT = 32
+
+logger = logging.getLogger(__name__)
+
+
+def _unique_names(paths):
+    """File stems of paths, with a numeric suffix where two stems collide."""
+    names, seen = [], {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return names
+
+
+def find_pet_images(paths):
+    """
+    Expand directories into the pet photos they contain.
+
+    Args:
+        paths (list[str]): Image files and/or directories of images
+
+    Returns:
+        list[str]: Image paths, directory contents in sorted order
+    """
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                          if name.lower().endswith(PET_EXTENSIONS))
+        else:
+            images.append(path)
+    return images
+
+
+class MatrixPlan:
+    """
+    The N pets x M outfits grid of one matrix run, with every input loaded once.
+
+    Each pet photo and outfit image is prepared once and each outfit
+    description read once, however many cells use them. Cells already in
+    the run's checkpoint are marked done; pose analysis is only needed for
+    pets that still have pending cells.
+    """
+
+    def __init__(self, generator, pet_paths, clothes_options, output_dir, pipeline=None):
+        """
+        Load the inputs and read the checkpoint.
+
+        Args:
+            generator (AnimalClothesGenerator): Generator whose preprocessor, caches and
+                metrics are used
+            pet_paths (list[str]): Pet photos, one grid row each
+            clothes_options (list[dict]): Outfits with 'name', 'image_path' and
+                'description_path' keys, as returned by catalog.load_clothes_options
+            output_dir (str): Directory for the cell images, checkpoint, index and contact sheet
+            pipeline (str, optional): Override the generator's pipeline mode
+        """
+        self.generator = generator
+        self.output_dir = output_dir
+        self.pipeline = generator.resolve_pipeline(pipeline)
+        self.checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+
+        for path in pet_paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Animal image not found: {path}")
+
+        self.pets = []
+        for name, path in zip(_unique_names(pet_paths), pet_paths):
+            self.pets.append({'name': name, 'image_path': path,
+                              'image': generator.prepare_image(path, 'animal')})
+
+        self.outfits = []
+        for clothes in clothes_options:
+            description = clothes.get('description')
+            if description is None:
+                description = generator.load_clothes_description(clothes['description_path'])
+            self.outfits.append({'name': clothes['name'], 'image_path': clothes['image_path'],
+                                 'description_path': clothes['description_path'], 'description': description,
+                                 'image': generator.prepare_image(clothes['image_path'], 'clothes')})
+
+        finished = self._read_checkpoint()
+        self.cells = []
+        for pet in self.pets:
+            for outfit in self.outfits:
+                # Names keep cells with identical inputs apart; the hashes notice edited inputs
+                key = make_cache_key(pet['name'], outfit['name'], pet['image'].pixel_hash,
+                                     outfit['image'].pixel_hash, outfit['description'], self.pipeline, IMAGE_MODEL)
+                output_path = os.path.join("cells", pet['name'], f"{outfit['name']}.png")
+                entry = finished.get(key)
+                done = entry is not None and os.path.exists(self.path(entry['output_path']))
+                self.cells.append({'key': key, 'pet': pet, 'outfit': outfit, 'output_path': output_path,
+                                   'entry': entry if done else None})
+
+    def path(self, output_path):
+        """
+        Locate a cell image.
+
+        Cell entries store output_path relative to output_dir, so the
+        checkpoint and index stay valid when the run is resumed from another
+        working directory or the directory is moved.
+
+        Args:
+            output_path (str): A cell's output_path
+
+        Returns:
+            str: Path of the image, output_dir joined in front
+        """
+        return os.path.join(self.output_dir, output_path)
+
+    def _read_checkpoint(self):
+        """Finished cells of earlier runs, by cell key."""
+        finished = {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write leaves a partial last line
+                        continue
+                    finished[entry['key']] = entry
+        except FileNotFoundError:
+            pass
+        return finished
+
+    @property
+    def pending(self):
+        return [cell for cell in self.cells if cell['entry'] is None]
+
+    @property
+    def model_calls(self):
+        """Model calls the pending cells need: one pose analysis per pet, one generation per cell."""
+        pending = self.pending
+        pets = {cell['pet']['name'] for cell in pending}
+        return (len(pets) if self.pipeline == PIPELINE_TWO_CALL else 0) + len(pending)
+
+
+def _cell_entry(cell, status, error=None, latency_seconds=None):
+    return {
+        'key': cell['key'],
+        'pet': cell['pet']['name'],
+        'outfit': cell['outfit']['name'],
+        'output_path': cell['output_path'] if status == 'ok' else None,
+        'status': status,
+        'error': error,
+        'latency_seconds': latency_seconds,
+    }
+
+
+def generate_matrix(generator, pet_paths, clothes_options, output_dir, max_workers=8, pipeline=None, resume=True):
+    """
+    Dress every pet in every outfit, yielding cell results as they finish.
+
+    Pose analyses start first, one per pet, and each cell waits only for
+    its own pet's pose. Finished cells are appended to checkpoint.jsonl,
+    so running again with the same output_dir skips them. index.json and
+    contact_sheet.png are written once all cells are done (or the caller
+    stops early).
+
+    Args:
+        generator (AnimalClothesGenerator): Generator making the model calls
+        pet_paths (list[str]): Pet photos, one grid row each
+        clothes_options (list[dict]): Outfits, one grid column each, as returned by
+            catalog.load_clothes_options
+        output_dir (str): Directory for the cell images, checkpoint, index and contact sheet
+        max_workers (int): Maximum parallel image generation calls; pose analyses
+            run on a separate pool of at most the same size
+        pipeline (str, optional): Override the generator's pipeline mode
+        resume (bool): Set to False to discard the checkpoint and regenerate every cell
+
+    Yields:
+        dict: Index entry for each cell generated in this run, with output_path
+            relative to output_dir
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if not resume:
+        try:
+            os.remove(os.path.join(output_dir, "checkpoint.jsonl"))
+        except FileNotFoundError:
+            pass
+
+    start = time.perf_counter()
+    plan = MatrixPlan(generator, pet_paths, clothes_options, output_dir, pipeline)
+    pending = plan.pending
+    logger.info("Matrix of %d pets x %d outfits: %d cells to generate (%d model calls), %d from the checkpoint",
+                len(plan.pets), len(plan.outfits), len(pending), plan.model_calls, len(plan.cells) - len(pending))
+
+    # Pose analyses get their own pool, so cells waiting for a pose never starve it
+    pose_executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(plan.pets))),
+                                       thread_name_prefix="matrix-pose")
+    cell_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="matrix-cell")
+    poses = {}
+    if plan.pipeline == PIPELINE_TWO_CALL:
+        for cell in pending:
+            pet = cell['pet']
+            if pet['name'] not in poses:
+                poses[pet['name']] = pose_executor.submit(generator.analyze_pose, pet['image'])
+
+    def dress(cell):
+        item_start = time.perf_counter()
+        try:
+            pose = poses[cell['pet']['name']].result() if plan.pipeline == PIPELINE_TWO_CALL else None
+            save_path = plan.path(cell['output_path'])
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            outfit = cell['outfit']
+            generated_image = generator.dress(cell['pet']['image'], pose, outfit['image'], save_path=save_path,
+                                              clothes_description=outfit['description'])
+            if generated_image is None:
+                return _cell_entry(cell, 'error', "Model response contained no image")
+            return _cell_entry(cell, 'ok', latency_seconds=round(time.perf_counter() - item_start, 3))
+        except Exception as e:
+            return _cell_entry(cell, 'error', str(e), round(time.perf_counter() - item_start, 3))
+
+    try:
+        futures = {cell_executor.submit(dress, cell): cell for cell in pending}
+        with open(plan.checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            for future in as_completed(futures):
+                entry = future.result()
+                futures[future]['entry'] = entry
+                if entry['status'] == 'ok':
+                    checkpoint.write(json.dumps(entry) + "\n")
+                    checkpoint.flush()
+                yield entry
+    finally:
+        # Drop queued cells if the caller stopped consuming early
+        cell_executor.shutdown(wait=True, cancel_futures=True)
+        pose_executor.shutdown(wait=True, cancel_futures=True)
+        write_index(plan, time.perf_counter() - start)
+        write_contact_sheet(plan)
+
+
+def write_index(plan, total_seconds=None):
+    """
+    Write index.json: the grid's pets and outfits and one entry per cell.
+
+    Args:
+        plan (MatrixPlan): Planned run, with cell entries filled in as they finished
+        total_seconds (float, optional): Duration of the run
+    """
+    cells = []
+    for cell in plan.cells:
+        cells.append(cell['entry'] or _cell_entry(cell, 'pending'))
+
+    index = {
+        'pets': [{'name': pet['name'], 'image_path': pet['image_path']} for pet in plan.pets],
+        'outfits': [{'name': outfit['name'], 'image_path': outfit['image_path']} for outfit in plan.outfits],
+        'pipeline': plan.pipeline,
+        'total_seconds': round(total_seconds, 3) if total_seconds is not None else None,
+        'contact_sheet': "contact_sheet.png",
+        'cells': cells,
+    }
+    with open(os.path.join(plan.output_dir, "index.json"), 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=2)
+
+
+def write_contact_sheet(plan, cell_size=CONTACT_SHEET_CELL_SIZE):
+    """
+    Write contact_sheet.png: one row per pet, one column per outfit.
+
+    Cells without an image (failed or not generated yet) are left blank.
+
+    Args:
+        plan (MatrixPlan): Planned run, with cell entries filled in as they finished
+        cell_size (tuple): (width, height) of each cell thumbnail
+    """
+    from PIL import Image, ImageDraw
+
+    width = CONTACT_SHEET_LABEL_WIDTH + cell_size[0] * len(plan.outfits)
+    height = CONTACT_SHEET_LABEL_HEIGHT + cell_size[1] * len(plan.pets)
+    sheet = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(sheet)
+
+    for column, outfit in enumerate(plan.outfits):
+        draw.text((CONTACT_SHEET_LABEL_WIDTH + column * cell_size[0] + 8, 10), outfit['name'], fill="black")
+    for row, pet in enumerate(plan.pets):
+        draw.text((8, CONTACT_SHEET_LABEL_HEIGHT + row * cell_size[1] + cell_size[1] // 2), pet['name'], fill="black")
+
+    for index, cell in enumerate(plan.cells):
+        row, column = divmod(index, len(plan.outfits))
+        entry = cell['entry']
+        if entry is None or entry['status'] != 'ok':
+            continue
+        try:
+            with Image.open(plan.path(entry['output_path'])) as image:
+                thumbnail = make_thumbnail(image.convert("RGB"), cell_size)
+        except OSError as e:
+            logger.warning("Skipping %s in the contact sheet: %s", plan.path(entry['output_path']), e)
+            continue
+        sheet.paste(thumbnail, (CONTACT_SHEET_LABEL_WIDTH + column * cell_size[0],
+                                CONTACT_SHEET_LABEL_HEIGHT + row * cell_size[1]))
+
+    sheet.save(os.path.join(plan.output_dir, "contact_sheet.png"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dress several pets in every outfit of the catalog.")
+    parser.add_argument("pets", nargs="+", help="Pet photos and/or directories of pet photos")
+    parser.add_argument("--output-dir", default="output/matrix",
+                        help="Where to write cell images, checkpoint.jsonl, index.json and contact_sheet.png")
+    parser.add_argument("--clothes-dir", default=CLOTHES_DIR, help="Directory with outfit images")
+    parser.add_argument("--describe-dir", default=CLOTHES_DESCRIBE_DIR, help="Directory with outfit descriptions")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum parallel image generation calls")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and regenerate every cell")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    pet_paths = find_pet_images(args.pets)
+    if not pet_paths:
+        parser.error("No pet photos found")
+    clothes_options = load_clothes_options(args.clothes_dir, args.describe_dir)
+    if not clothes_options:
+        parser.error(f"No outfits found in {args.clothes_dir} with descriptions in {args.describe_dir}")
+
+    generator = AnimalClothesGenerator()
+
+    start = time.perf_counter()
+    failures = 0
+    for index, entry in enumerate(generate_matrix(generator, pet_paths, clothes_options, args.output_dir,
+                                                  max_workers=args.workers, resume=not args.fresh), 1):
+        if entry['status'] == 'ok':
+            output_path = os.path.join(args.output_dir, entry['output_path'])
+            print(f"[{index}] {entry['pet']} x {entry['outfit']}: {output_path} ({entry['latency_seconds']:.1f}s)")
+        else:
+            failures += 1
+            print(f"[{index}] {entry['pet']} x {entry['outfit']}: FAILED - {entry['error']}")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s, {failures} failed. "
+          f"Index: {args.output_dir}/index.json, contact sheet: {args.output_dir}/contact_sheet.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _label_key(stage, attributes):
+    return stage, attributes.get("model", "")
+
+
+class InMemoryHistogramSink:
+    """
+    Keeps every span duration in memory, grouped by stage and model, and
+    reports counts and percentiles.
+    """
+
+    def __init__(self, max_samples=10000):
+        """
+        Args:
+            max_samples (int): Samples kept per stage; older ones are dropped
+        """
+        self.max_samples = max_samples
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, attributes):
+        with self._lock:
+            samples = self._samples[_label_key(stage, attributes)]
+            samples.append(seconds)
+            if len(samples) > self.max_samples:
+                del samples[:len(samples) - self.max_samples]
+
+    def summary(self):
+        """
+        Summarise recorded spans.
+
+        Returns:
+            dict: "stage" or "stage[model]" -> count, mean, p50, p95, p99 and max in seconds
+        """
+        with self._lock:
+            snapshot = {key: sorted(samples) for key, samples in self._samples.items()}
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+        summary = {}
+        for (stage, model), values in snapshot.items():
+            name = f"{stage}[{model}]" if model else stage
+            summary[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": values[-1],
+            }
+        return summary
+
+
+class JsonLogSink:
+    """
+    Emits one JSON object per span, either to a logger or to a text stream.
+    """
+
+    def __init__(self, stream=None, log=logger, level=logging.INFO):
+        """
+        Args:
+            stream (file, optional): Write JSON lines here instead of logging them
+            log (logging.Logger): Logger used when no stream is given
+            level (int): Log level for the span records
+        """
+        self.stream = stream
+        self.log = log
+        self.level = level
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, attributes):
+        line = json.dumps({"ts": time.time(), "stage": stage, "seconds": round(seconds, 6), **attributes},
+                          default=str)
+        if self.stream is None:
+            self.log.log(self.level, line)
+        else:
+            with self._lock:
+                self.stream.write(line + "\n")
+                self.stream.flush()
+
+
+class PrometheusSink:
+    """
+    Aggregates spans into Prometheus histograms, rendered in the text
+    exposition format by render().
+    """
+
+    def __init__(self, prefix="pet_clothes", buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            prefix (str): Metric name prefix
+            buckets (tuple): Histogram bucket upper bounds in seconds
+        """
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, attributes):
+        key = _label_key(stage, attributes)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+            # Payload sizes and token usage become counters
+            for name in ("request_bytes", "response_bytes", "prompt_tokens", "output_tokens", "total_tokens"):
+                value = attributes.get(name)
+                if isinstance(value, (int, float)):
+                    self._counters[(name, stage, key[1])] += value
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, e.g. for a /metrics endpoint or a textfile collector
+        """
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {name} Duration of generation pipeline stages.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for (stage, model), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",model="{model}"'
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram['sum']}")
+                lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+
+            declared = set()
+            for (counter, stage, model), value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{counter}_total"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                lines.append(f'{metric}{{stage="{stage}",model="{model}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRecorder:
+    """
+    Times pipeline stages and forwards each finished span to every sink.
+    """
+
+    def __init__(self, sinks=None):
+        """
+        Args:
+            sinks (list, optional): Objects with a record(stage, seconds, attributes)
+                method; defaults to a single InMemoryHistogramSink
+        """
+        self.sinks = list(sinks) if sinks is not None else [InMemoryHistogramSink()]
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """
+        Time a block as one stage.
+
+        The yielded dict can be filled with attributes (payload sizes, token
+        counts, ...) while the block runs. Failed blocks are recorded with an
+        "error" attribute.
+
+        Args:
+            stage (str): Stage name, e.g. "model_call"
+            **attributes: Initial attributes such as the model name
+        """
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            for sink in self.sinks:
+                try:
+                    sink.record(stage, seconds, attributes)
+                except Exception:
+                    logger.exception("Metrics sink %r failed", sink)
+
+    def summary(self):
+        """
+        Summary of the first InMemoryHistogramSink, if any.
+
+        Returns:
+            dict: See InMemoryHistogramSink.summary
+        """
+        for sink in self.sinks:
+            if isinstance(sink, InMemoryHistogramSink):
+                return sink.summary()
+        return {}
+
+
+def usage_attributes(response):
+    """
+    Token usage from a generate_content response, as span attributes.
+
+    Args:
+        response (types.GenerateContentResponse): Model response
+
+    Returns:
+        dict: prompt_tokens, output_tokens and total_tokens where reported
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    attributes = {
+        "prompt_tokens": usage.prompt_token_count,
+        "output_tokens": usage.candidates_token_count,
+        "total_tokens": usage.total_token_count,
+    }
+    return {name: value for name, value in attributes.items() if value is not None}
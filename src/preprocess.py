@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from cache import hash_image_pixels, make_cache_key
+
+DEFAULT_MAX_EDGE = 1536
+DEFAULT_FORMAT = "WEBP"
+DEFAULT_QUALITY = 90
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+logger = logging.getLogger(__name__)
+
+
+def _is_pil_image(source):
+    # A PIL image can only exist once PIL has been imported, so this check
+    # does not import it
+    image_module = sys.modules.get("PIL.Image")
+    return image_module is not None and isinstance(source, image_module.Image)
+
+
+class PreparedImage:
+    """
+    An input image decoded once, normalised and re-encoded for upload.
+    """
+
+    def __init__(self, data, mime_type, size, pixel_hash, bytes_before):
+        """
+        Args:
+            data (bytes): Encoded image sent to the model
+            mime_type (str): MIME type of data
+            size (tuple): (width, height) after normalisation
+            pixel_hash (str): Hash of the normalised pixels, stable across re-encodes
+            bytes_before (int): Size of the original encoded input
+        """
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.pixel_hash = pixel_hash
+        self.bytes_before = bytes_before
+
+    @property
+    def bytes_after(self):
+        return len(self.data)
+
+    def part(self):
+        """
+        Wrap the encoded bytes for a generate_content request.
+
+        Returns:
+            types.Part: Inline image part
+        """
+        from google.genai import types
+
+        return types.Part.from_bytes(data=self.data, mime_type=self.mime_type)
+
+    def to_image(self):
+        """
+        Decode the normalised image.
+
+        Returns:
+            PIL.Image: Normalised image
+        """
+        from PIL import Image
+
+        return Image.open(BytesIO(self.data))
+
+
+class ImagePreprocessor:
+    """
+    Decodes input images once, applies EXIF orientation, downsizes them to a
+    maximum edge and re-encodes them compactly. Results are kept in a small LRU
+    so the pose analysis call and the generation call (and later generations
+    with the same outfit) share the same encoded bytes.
+    """
+
+    def __init__(self, max_edge=DEFAULT_MAX_EDGE, image_format=DEFAULT_FORMAT, quality=DEFAULT_QUALITY,
+                 max_entries=64):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            max_edge (int, optional): Longest allowed edge in pixels; None keeps the original size
+            image_format (str): Upload format, one of WEBP, JPEG or PNG
+            quality (int): Encoder quality for WEBP/JPEG
+            max_entries (int): Number of prepared images kept in memory
+        """
+        if image_format not in MIME_TYPES:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.max_edge = max_edge
+        self.image_format = image_format
+        self.quality = quality
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"images": 0, "cache_hits": 0, "bytes_before": 0, "bytes_after": 0}
+
+    def _normalise(self, image):
+        from PIL import Image, ImageOps
+
+        image = ImageOps.exif_transpose(image)
+        if self.max_edge and max(image.size) > self.max_edge:
+            image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+
+        if self.image_format == "JPEG":
+            if image.mode in ("RGBA", "LA", "P"):
+                # JPEG has no alpha channel; flatten onto white
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or image.mode == "P" else "RGB")
+        return image
+
+    def _encode(self, image):
+        buffer = BytesIO()
+        if self.image_format == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=self.image_format, quality=self.quality)
+        return buffer.getvalue()
+
+    def _identify(self, source):
+        """
+        Work out a cache identity, a display label and the input size for a source.
+
+        Returns:
+            tuple: (identity, label, bytes_before, source to decode from)
+        """
+        if isinstance(source, (str, os.PathLike)):
+            stat = os.stat(source)
+            identity = f"path:{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}"
+            return identity, os.path.basename(source), stat.st_size, source
+
+        if _is_pil_image(source):
+            # Already decoded in memory: identify by pixels, there is no encoded size
+            return f"pixels:{hash_image_pixels(source)}", "in-memory image", len(source.tobytes()), source
+
+        if hasattr(source, "getvalue"):
+            source = source.getvalue()
+        elif hasattr(source, "read"):
+            source = source.read()
+        data = bytes(source)
+        return f"bytes:{hashlib.sha256(data).hexdigest()}", "uploaded image", len(data), BytesIO(data)
+
+    def prepare(self, source):
+        """
+        Prepare an image for upload, reusing an earlier result for the same input.
+
+        Args:
+            source: Path to an image file, encoded image bytes, a file-like object
+                (e.g. a Streamlit upload), a PIL image, or an already prepared image
+
+        Returns:
+            PreparedImage: Normalised, encoded image
+        """
+        if isinstance(source, PreparedImage):
+            return source
+
+        identity, label, bytes_before, decode_source = self._identify(source)
+        key = make_cache_key(identity, self.max_edge, self.image_format, self.quality)
+        with self._lock:
+            prepared = self._cache.get(key)
+            if prepared is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return prepared
+
+        if _is_pil_image(decode_source):
+            normalised = self._normalise(decode_source)
+        else:
+            from PIL import Image
+
+            with Image.open(decode_source) as image:
+                image.load()
+                normalised = self._normalise(image)
+        prepared = PreparedImage(
+            data=self._encode(normalised),
+            mime_type=MIME_TYPES[self.image_format],
+            size=normalised.size,
+            pixel_hash=hash_image_pixels(normalised),
+            bytes_before=bytes_before,
+        )
+        logger.info("Prepared %s: %.0f KB -> %.0f KB (%dx%d %s)", label, prepared.bytes_before / 1024,
+                    prepared.bytes_after / 1024, prepared.size[0], prepared.size[1], self.image_format)
+
+        with self._lock:
+            self._cache[key] = prepared
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self.stats["images"] += 1
+            self.stats["bytes_before"] += prepared.bytes_before
+            self.stats["bytes_after"] += prepared.bytes_after
+
+        return prepared
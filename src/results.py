@@ -0,0 +1,316 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from cache import make_cache_key
+from events import ImageReady, Stored
+
+# File extension and MIME type of each supported output format
+RESULT_FORMATS = {
+    "WEBP": {"extension": "webp", "mime": "image/webp"},
+    "JPEG": {"extension": "jpg", "mime": "image/jpeg"},
+    "PNG": {"extension": "png", "mime": "image/png"},
+}
+
+
+class ResultStore:
+    """
+    Holds generated images for display, encoded once to a compact format.
+
+    Callers keep only the handle returned by put. The encoded bytes live in
+    a file under store_dir; the most recently used ones are also kept in
+    memory up to max_memory_bytes per process. Identical images share one
+    entry. A session's previous result is released when it stores a new
+    one, and sessions that have not stored anything for session_ttl_seconds
+    are forgotten along with their in-memory results.
+    """
+
+    def __init__(self, store_dir="cache/store", image_format="WEBP", quality=85,
+                 max_memory_bytes=64 * 1024 ** 2, max_disk_bytes=1024 ** 3, session_ttl_seconds=3600.0):
+        """
+        Initialize the result store.
+
+        Args:
+            store_dir (str): Directory holding the encoded images
+            image_format (str): "WEBP", "JPEG" or "PNG"
+            quality (int): Encoder quality for WEBP and JPEG
+            max_memory_bytes (int): Encoded bytes kept in memory before evicting
+                the least recently used entries
+            max_disk_bytes (int): Total size of store_dir before evicting the
+                least recently used files
+            session_ttl_seconds (float): How long a session's result stays pinned
+                after its last put
+        """
+        image_format = image_format.upper()
+        if image_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format {image_format!r}, expected one of {', '.join(RESULT_FORMATS)}")
+        self.store_dir = store_dir
+        self.image_format = image_format
+        self.quality = quality
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.session_ttl_seconds = session_ttl_seconds
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # session_id -> (handle, time of its last put), oldest first
+        self._sessions = OrderedDict()
+        # handle -> ids of the sessions whose current result it is
+        self._handle_sessions = {}
+        self._lock = threading.Lock()
+        self.stats = {"puts": 0, "encodes": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "memory_evictions": 0, "disk_evictions": 0, "expired_sessions": 0}
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, size, _ in self._list_files())
+
+    @property
+    def mime_type(self):
+        return RESULT_FORMATS[self.image_format]["mime"]
+
+    @property
+    def memory_bytes(self):
+        return self._memory_bytes
+
+    @property
+    def session_count(self):
+        return len(self._sessions)
+
+    def path(self, handle):
+        """
+        File holding an entry's encoded bytes.
+
+        Args:
+            handle (str): Handle returned by put
+
+        Returns:
+            str: Path inside store_dir (which may have been evicted)
+        """
+        return os.path.join(self.store_dir, f"{handle}.{RESULT_FORMATS[self.image_format]['extension']}")
+
+    def _list_files(self):
+        extension = f".{RESULT_FORMATS[self.image_format]['extension']}"
+        with os.scandir(self.store_dir) as entries:
+            files = []
+            for entry in entries:
+                if entry.name.endswith(extension):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            return files
+
+    def _encode(self, image):
+        """Encode a PIL image with the store's format and quality."""
+        if self.image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        options = {} if self.image_format == "PNG" else {"quality": self.quality}
+        if self.image_format == "WEBP":
+            options["method"] = 4
+        buffer = BytesIO()
+        image.save(buffer, format=self.image_format, **options)
+        return buffer.getvalue()
+
+    def put(self, image, session_id=None):
+        """
+        Encode an image once and store it.
+
+        Args:
+            image (bytes or PIL.Image): Encoded image as returned by the model, or a decoded image
+            session_id (str, optional): Owner of the result; the session's previous
+                result is released from memory
+
+        Returns:
+            str: Handle for get, path and release
+        """
+        if isinstance(image, (bytes, bytearray)):
+            content_hash = hashlib.sha256(image).hexdigest()
+        else:
+            content_hash = hashlib.sha256(image.tobytes()).hexdigest()
+        handle = make_cache_key(content_hash, self.image_format, self.quality)
+
+        path = self.path(handle)
+        data = self._memory_get(handle)
+        if data is None and not os.path.exists(path):
+            if isinstance(image, (bytes, bytearray)):
+                from PIL import Image
+
+                with Image.open(BytesIO(image)) as decoded:
+                    data = self._encode(decoded)
+            else:
+                data = self._encode(image)
+            self._write(path, data)
+            with self._lock:
+                self.stats["encodes"] += 1
+        else:
+            self._touch(path)
+
+        with self._lock:
+            self.stats["puts"] += 1
+            now = time.monotonic()
+            self._expire_sessions(now)
+            if session_id is not None:
+                self._unlink_session(session_id, keep=handle)
+                self._sessions[session_id] = (handle, now)
+                self._sessions.move_to_end(session_id)
+                self._handle_sessions.setdefault(handle, set()).add(session_id)
+            if data is not None:
+                self._remember(handle, data)
+        return handle
+
+    def _unlink_session(self, session_id, keep=None):
+        """Forget a session; its result leaves memory unless another session (or keep) uses it."""
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return
+        handle = entry[0]
+        sessions = self._handle_sessions.get(handle)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._handle_sessions[handle]
+                if handle != keep:
+                    self._forget(handle)
+
+    def _expire_sessions(self, now):
+        while self._sessions:
+            session_id, (_, last_put) = next(iter(self._sessions.items()))
+            if now - last_put <= self.session_ttl_seconds:
+                break
+            self._unlink_session(session_id)
+            self.stats["expired_sessions"] += 1
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+
+        with self._lock:
+            try:
+                self._disk_bytes -= os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+            # Atomic rename so concurrent readers never see a partial file
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(data)
+
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _memory_get(self, handle):
+        with self._lock:
+            data = self._memory.get(handle)
+            if data is not None:
+                self._memory.move_to_end(handle)
+            return data
+
+    def _remember(self, handle, data):
+        if handle in self._memory:
+            self._memory.move_to_end(handle)
+            return
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory[handle] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    def _forget(self, handle):
+        data = self._memory.pop(handle, None)
+        if data is not None:
+            self._memory_bytes -= len(data)
+
+    def _evict_disk(self):
+        files = sorted(self._list_files())
+        self._disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self.stats["disk_evictions"] += 1
+            # Sessions pointing at the evicted file have no result any more
+            handle = os.path.splitext(os.path.basename(path))[0]
+            for session_id in self._handle_sessions.pop(handle, ()):
+                self._sessions.pop(session_id, None)
+            self._forget(handle)
+
+    def get(self, handle):
+        """
+        Encoded bytes of a stored image.
+
+        Args:
+            handle (str): Handle returned by put
+
+        Returns:
+            bytes or None: Encoded image, or None if it has been evicted from disk
+        """
+        data = self._memory_get(handle)
+        if data is not None:
+            with self._lock:
+                self.stats["memory_hits"] += 1
+            return data
+
+        path = self.path(handle)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        self._touch(path)
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            self._remember(handle, data)
+        return data
+
+    def release(self, session_id):
+        """
+        Drop a session's result from memory, e.g. when the session ends.
+
+        The file stays on disk until it is evicted.
+
+        Args:
+            session_id (str): Session passed to put
+        """
+        with self._lock:
+            self._unlink_session(session_id)
+
+
+def store_results(events, store, session_id=None):
+    """
+    Pass generation events through, replacing each ImageReady with a Stored
+    event once its image is in the store.
+
+    Long-lived consumers (e.g. JobQueue jobs) then hold a handle instead of
+    the decoded image and the model's encoded bytes.
+
+    Args:
+        events (iterable): Events from AnimalClothesGenerator.stream_dressed_animal
+        store (ResultStore): Where to put the generated image
+        session_id (str, optional): Owner of the result
+
+    Yields:
+        GenerationEvent: The input events, with Stored instead of ImageReady
+    """
+    for event in events:
+        if isinstance(event, ImageReady):
+            yield Stored(store.put(event.image_data, session_id), cached=event.cached)
+        else:
+            yield event
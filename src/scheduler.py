@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+# HTTP statuses worth retrying: quota, transient server errors and gateway timeouts
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+# A timeout this close to the request's deadline is the per-attempt timeout
+# derived from that deadline, not a slow model
+DEADLINE_SLACK_SECONDS = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerError(RuntimeError):
+    """Base class for requests the scheduler refused to send."""
+
+
+class CircuitOpenError(SchedulerError):
+    """Raised while a model's circuit breaker is open after repeated failures."""
+
+
+class DeadlineExceededError(SchedulerError, TimeoutError):
+    """Raised when a request cannot complete (or even start) before its deadline."""
+
+
+class TokenBucket:
+    """
+    Request rate limiter. Callers reserve a token and are told how long to
+    wait for it, so concurrent callers queue up evenly spaced instead of
+    all retrying at once.
+    """
+
+    def __init__(self, requests_per_minute, burst):
+        """
+        Args:
+            requests_per_minute (float): Sustained request rate
+            burst (int): Requests that may be sent back to back after an idle period
+        """
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, deadline=None):
+        """
+        Take a token, possibly one that only becomes available in the future.
+
+        Args:
+            deadline (float, optional): time.monotonic() by which the request must start
+
+        Returns:
+            float: Seconds to wait before sending the request
+
+        Raises:
+            DeadlineExceededError: If the token would only be available after the deadline;
+                no token is taken in that case
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                raise DeadlineExceededError(f"Rate limit queue is {wait:.1f}s long, past the request deadline")
+            self._tokens -= 1.0
+            return wait
+
+    def pause(self, seconds):
+        """Drain the burst and push the next free token seconds into the future, e.g. after a 429."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a model after failure_threshold consecutive
+    failures. After reset_seconds one probe request is let through; its
+    outcome closes the circuit again or keeps it open.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_seconds (float): How long the circuit stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open and it is not yet time for a probe
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            remaining = self._opened_at + self.reset_seconds - now
+            # Only one probe at a time; a probe that never reported back expires
+            probing = self._probe_started is not None and now - self._probe_started < self.reset_seconds
+            if remaining > 0 or probing:
+                raise CircuitOpenError(f"Model temporarily unavailable, retry in {max(remaining, 1):.0f}s")
+            self._probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_inconclusive(self):
+        """
+        An attempt that says nothing about the model's health, e.g. a 429 or the
+        caller's own timeout: free the probe slot, keep the failure count.
+        """
+        with self._lock:
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Opening circuit after %d consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._probe_started = None
+
+
+def _api_error_type():
+    # Imported on the first failure only; the SDK is expensive to import and
+    # successful calls never need it here
+    from google.genai import errors
+
+    return errors.APIError
+
+
+def _retry_after(error):
+    """Server-suggested delay in seconds from a google.rpc.RetryInfo detail, if any."""
+    details = error.details.get("error", error.details) if isinstance(error.details, dict) else {}
+    for detail in details.get("details", None) or []:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("RetryInfo"):
+            match = re.match(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class ModelScheduler:
+    """
+    Sends model calls through a per-model token bucket and circuit breaker,
+    retrying throttled and transient failures with jittered exponential
+    backoff until the request's deadline.
+    """
+
+    def __init__(self, model_limits=None, default_limits=None, max_attempts=5, base_backoff=1.0,
+                 max_backoff=30.0, failure_threshold=5, reset_seconds=30.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            model_limits (dict, optional): Model name -> dict(requests_per_minute=..., burst=...)
+            default_limits (dict, optional): Limits for models missing from model_limits;
+                None leaves them unlimited
+            max_attempts (int): Attempts per request, including the first one
+            base_backoff (float): Backoff cap in seconds after the first failure; doubles per retry
+            max_backoff (float): Upper bound for a single backoff
+            failure_threshold (int): Consecutive 5xx or transport failures that open a
+                model's circuit; 429s only slow the model's queue down
+            reset_seconds (float): Seconds an open circuit waits before a probe request
+        """
+        self.model_limits = dict(model_limits or {})
+        self.default_limits = default_limits
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._buckets = {}
+        self._breakers = {}
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "circuit_rejections": 0,
+                      "deadline_exceeded": 0, "queued_seconds": 0.0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _bucket(self, model):
+        with self._lock:
+            if model not in self._buckets:
+                limits = self.model_limits.get(model, self.default_limits)
+                self._buckets[model] = TokenBucket(**limits) if limits else None
+            return self._buckets[model]
+
+    def breaker(self, model):
+        """
+        Circuit breaker of one model.
+
+        Args:
+            model (str): Model name
+
+        Returns:
+            CircuitBreaker: The model's breaker, created on first use
+        """
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            return self._breakers[model]
+
+    def _is_retryable(self, error):
+        import httpx
+
+        if isinstance(error, _api_error_type()):
+            return error.code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+
+    def _is_caller_timeout(self, error, deadline):
+        """Whether error is the per-attempt timeout set from the caller's deadline firing."""
+        import httpx
+
+        return (deadline is not None and isinstance(error, httpx.TimeoutException)
+                and time.monotonic() >= deadline - DEADLINE_SLACK_SECONDS)
+
+    def _backoff(self, attempt, error):
+        """Seconds to wait before retry number attempt (1-based)."""
+        # Full jitter keeps many throttled callers from retrying in lockstep
+        delay = self._random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+        if isinstance(error, _api_error_type()):
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+    def _check_deadline(self, deadline):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceededError("Request deadline passed")
+        return remaining
+
+    def _admit(self, model, deadline):
+        """Check the breaker and reserve a rate limit token; returns the seconds to wait."""
+        try:
+            self.breaker(model).before_call()
+        except CircuitOpenError:
+            self._count("circuit_rejections")
+            raise
+        bucket = self._bucket(model)
+        if bucket is None:
+            return 0.0
+        try:
+            wait = bucket.reserve(deadline)
+        except DeadlineExceededError:
+            self._count("deadline_exceeded")
+            raise
+        self._count("queued_seconds", wait)
+        return wait
+
+    def _after_failure(self, model, error, attempt, deadline):
+        """
+        Record a failed attempt and decide whether to retry.
+
+        Returns:
+            float: Seconds to wait before the next attempt
+
+        Raises:
+            DeadlineExceededError: When the attempt timed out because the deadline passed
+            The original error when it is not retryable or no attempts or time remain
+        """
+        if self._is_caller_timeout(error, deadline):
+            # The caller ran out of time; the model may be fine
+            self.breaker(model).record_inconclusive()
+            self._count("deadline_exceeded")
+            raise DeadlineExceededError("Request deadline passed while waiting for the model") from error
+
+        retryable = self._is_retryable(error)
+        api_error = isinstance(error, _api_error_type())
+        throttled = api_error and error.code == 429
+        if throttled:
+            # Quota exhaustion is handled by the bucket pause and retry below; counting
+            # it would open the circuit exactly when requests should queue up
+            self.breaker(model).record_inconclusive()
+        elif retryable:
+            self.breaker(model).record_failure()
+        elif api_error and 400 <= error.code < 500:
+            # The model answered (e.g. 400 for a bad request), so it is healthy
+            self.breaker(model).record_success()
+        else:
+            # Not an answer from the model (e.g. a response that failed to parse)
+            self.breaker(model).record_inconclusive()
+        if not retryable or attempt >= self.max_attempts:
+            self._count("failures")
+            raise error
+
+        delay = self._backoff(attempt, error)
+        if throttled:
+            self._count("throttled")
+            # Quota is shared, so everybody else queued for this model waits too
+            bucket = self._bucket(model)
+            if bucket is not None:
+                bucket.pause(delay)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self._count("failures")
+            raise error
+
+        self._count("retries")
+        logger.warning("%s call failed (%s), retry %d/%d in %.1fs", model, error, attempt,
+                       self.max_attempts - 1, delay)
+        return delay
+
+    def call(self, model, send, deadline=None):
+        """
+        Send a request, waiting for rate limit capacity and retrying transient failures.
+
+        Args:
+            model (str): Model name, selects the token bucket and circuit breaker
+            send (callable): Makes one attempt; called with the seconds left until the
+                deadline (or None) so it can set a per-attempt timeout
+            deadline (float, optional): time.monotonic() by which the call must finish
+
+        Returns:
+            The return value of send
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open
+            DeadlineExceededError: If the deadline passes while waiting, or the attempt
+                timed out at the deadline
+            errors.APIError: The last error once retries are exhausted, or any non-retryable error
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_deadline(deadline)
+            time.sleep(self._admit(model, deadline))
+            # Outside the try: a deadline passing before the send is not a model failure
+            remaining = self._check_deadline(deadline)
+            try:
+                result = send(remaining)
+            except Exception as e:
+                time.sleep(self._after_failure(model, e, attempt, deadline))
+                continue
+            self.breaker(model).record_success()
+            return result
+
+    async def acall(self, model, send, deadline=None):
+        """
+        Async counterpart of call; send returns an awaitable.
+
+        Args:
+            model (str): Model name, selects the token bucket and circuit breaker
+            send (callable): Coroutine function making one attempt, called with the
+                seconds left until the deadline (or None)
+            deadline (float, optional): time.monotonic() by which the call must finish
+
+        Returns:
+            The result of the awaited send
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_deadline(deadline)
+            await asyncio.sleep(self._admit(model, deadline))
+            remaining = self._check_deadline(deadline)
+            try:
+                result = await send(remaining)
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(model, e, attempt, deadline))
+                continue
+            self.breaker(model).record_success()
+            return result
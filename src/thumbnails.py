@@ -0,0 +1,97 @@
+import os
+from io import BytesIO
+
+from cache import make_cache_key
+
+THUMBNAIL_SIZE = (240, 160)
+THUMBNAIL_CACHE_DIR = "cache/thumbnails"
+
+def make_thumbnail(image, size=THUMBNAIL_SIZE):
+    """
+    Centre-crop an image to the target aspect ratio and resize it.
+    
+    Args:
+        image (PIL.Image): Source image
+        size (tuple): Target (width, height)
+        
+    Returns:
+        PIL.Image: Thumbnail of exactly the target size
+    """
+    from PIL import Image
+    
+    # Crop to the target aspect ratio (width:height) if needed
+    original_width, original_height = image.size
+    target_aspect_ratio = size[0] / size[1]  # width / height
+    current_aspect_ratio = original_width / original_height
+    
+    if current_aspect_ratio > target_aspect_ratio:
+        # Image is too wide, crop width
+        new_width = int(original_height * target_aspect_ratio)
+        left = (original_width - new_width) // 2
+        image = image.crop((left, 0, left + new_width, original_height))
+    elif current_aspect_ratio < target_aspect_ratio:
+        # Image is too tall, crop height
+        new_height = int(original_width / target_aspect_ratio)
+        top = (original_height - new_height) // 2
+        image = image.crop((0, top, original_width, top + new_height))
+    
+    # Resize image to fixed dimensions for consistency
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+def thumbnail_cache_path(image_path, mtime_ns, size=THUMBNAIL_SIZE, cache_dir=THUMBNAIL_CACHE_DIR):
+    """
+    Location of the cached thumbnail for one version of a source image.
+    
+    The key includes the source modification time, so editing or replacing the
+    source image automatically maps to a new cache entry.
+    
+    Args:
+        image_path (str): Path to the source image
+        mtime_ns (int): Source modification time in nanoseconds
+        size (tuple): Target (width, height)
+        cache_dir (str): Directory holding cached thumbnails
+        
+    Returns:
+        str: Path of the cached thumbnail PNG
+    """
+    key = make_cache_key(os.path.abspath(image_path), mtime_ns, f"{size[0]}x{size[1]}")
+    return os.path.join(cache_dir, f"{key}.png")
+
+def get_thumbnail_bytes(image_path, size=THUMBNAIL_SIZE, cache_dir=THUMBNAIL_CACHE_DIR, mtime_ns=None):
+    """
+    Return the encoded thumbnail for an image, rendering it only on a cache miss.
+    
+    Args:
+        image_path (str): Path to the source image
+        size (tuple): Target (width, height)
+        cache_dir (str): Directory holding cached thumbnails
+        mtime_ns (int, optional): Source modification time, looked up when omitted
+        
+    Returns:
+        bytes: PNG-encoded thumbnail
+    """
+    if mtime_ns is None:
+        mtime_ns = os.stat(image_path).st_mtime_ns
+    cache_path = thumbnail_cache_path(image_path, mtime_ns, size, cache_dir)
+    
+    try:
+        with open(cache_path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        pass
+    
+    from PIL import Image
+    
+    with Image.open(image_path) as image:
+        buffer = BytesIO()
+        make_thumbnail(image, size).save(buffer, format="PNG")
+    data = buffer.getvalue()
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    # Atomic rename so concurrent sessions never read a half-written file
+    os.replace(tmp_path, cache_path)
+    
+    return data
@@ -1,10 +1,28 @@
 # streamlit run src/ui.py
 import streamlit as st
-import os
-from PIL import Image
-import tempfile
-from gen_image import AnimalClothesGenerator
-import traceback
+from events import PoseReady, Stored, TextChunk
+from jobs import DONE, QUEUED, JobQueue, QueueFullError
+from scheduler import CircuitOpenError, DeadlineExceededError
+from catalog import ClothesCatalog
+from results import ResultStore, store_results
+from thumbnails import THUMBNAIL_SIZE, get_thumbnail_bytes
+import uuid
+
+# Upper bound for one generation, including waiting for model quota and retries
+GENERATION_TIMEOUT_SECONDS = 180
+
+# How a generation is run:
+#   "two_call"     analyse the pose when "Style My Pet" is clicked, then generate
+#   "speculative"  start the pose analysis as soon as a photo is uploaded, so only
+#                  the image call is left when the outfit has been picked
+#   "single_call"  skip pose analysis and let the image model keep the pose itself
+PIPELINE_MODE = "speculative"
+
+# Generated images are encoded once in this format and kept out of session state;
+# RESULT_MEMORY_BYTES caps the encoded bytes held in memory by this process
+RESULT_FORMAT = "WEBP"
+RESULT_QUALITY = 85
+RESULT_MEMORY_BYTES = 64 * 1024 ** 2
 
 # Set page config
 st.set_page_config(
@@ -65,28 +83,38 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def load_clothes_options():
-    """Load available clothes options from the images directory"""
-    clothes_dir = "images/clothes"
-    clothes_describe_dir = "images/clothes_describe"
-    
-    clothes_options = []
-    
-    if os.path.exists(clothes_dir) and os.path.exists(clothes_describe_dir):
-        clothes_files = [f for f in os.listdir(clothes_dir) if f.endswith('.png')]
-        
-        for clothes_file in clothes_files:
-            clothes_name = os.path.splitext(clothes_file)[0]
-            description_file = f"{clothes_name}.txt"
-            
-            if os.path.exists(os.path.join(clothes_describe_dir, description_file)):
-                clothes_options.append({
-                    'name': clothes_name,
-                    'image_path': os.path.join(clothes_dir, clothes_file),
-                    'description_path': os.path.join(clothes_describe_dir, description_file)
-                })
-    
-    return clothes_options
+@st.cache_resource
+def get_clothes_catalog():
+    """Process-wide outfit catalog, indexed once and refreshed when its files change"""
+    return ClothesCatalog()
+
+@st.cache_resource
+def get_job_queue():
+    """Process-wide worker pool that runs generations outside the script thread"""
+    return JobQueue(max_workers=4, max_queued=32, per_session_limit=1)
+
+def shared_generator():
+    """The process-wide generator; gen_image and the model SDK are imported on first use, not before the first paint"""
+    from gen_image import get_shared_generator
+    return get_shared_generator()
+
+@st.cache_resource
+def get_result_store():
+    """Process-wide store of generated images; sessions only keep a handle"""
+    return ResultStore(image_format=RESULT_FORMAT, quality=RESULT_QUALITY, max_memory_bytes=RESULT_MEMORY_BYTES)
+
+def style_pet(result_store, session_id, **kwargs):
+    """Job body: stream a generation, storing the image so the job only holds its handle"""
+    # Runs on a worker thread, so result_store is resolved by the script thread
+    # (st.cache_resource needs the script run context)
+    events = shared_generator().stream_dressed_animal(**kwargs)
+    return store_results(events, result_store, session_id)
+
+@st.cache_data(show_spinner=False, max_entries=5000)
+def load_thumbnail(image_path, mtime_ns, size):
+    """Grid thumbnail bytes, memoised per process and backed by the on-disk thumbnail cache"""
+    # mtime_ns is part of the memo key, so an edited source image is re-rendered
+    return get_thumbnail_bytes(image_path, size, mtime_ns=mtime_ns)
 
 def display_clothes_selection(clothes_options):
     """Display clothes options for selection"""
@@ -115,33 +143,18 @@ def display_clothes_selection(clothes_options):
                 
                 with cols[col_idx]:
                     try:
-                        clothes_image = Image.open(clothes['image_path'])
-                        
-                        # Crop to 6:4 aspect ratio (width:height) if needed
-                        original_width, original_height = clothes_image.size
-                        target_aspect_ratio = 6 / 4  # width / height
-                        current_aspect_ratio = original_width / original_height
-                        
-                        if current_aspect_ratio > target_aspect_ratio:
-                            # Image is too wide, crop width
-                            new_width = int(original_height * target_aspect_ratio)
-                            left = (original_width - new_width) // 2
-                            clothes_image = clothes_image.crop((left, 0, left + new_width, original_height))
-                        elif current_aspect_ratio < target_aspect_ratio:
-                            # Image is too tall, crop height
-                            new_height = int(original_width / target_aspect_ratio)
-                            top = (original_height - new_height) // 2
-                            clothes_image = clothes_image.crop((0, top, original_width, top + new_height))
-                        
-                        # Resize image to fixed dimensions (240x160) for consistency
-                        clothes_image = clothes_image.resize((240, 160), Image.Resampling.LANCZOS)
+                        clothes_image = load_thumbnail(
+                            clothes['image_path'],
+                            clothes['image_mtime_ns'],
+                            THUMBNAIL_SIZE
+                        )
 
                         # Display image with fixed dimensions
                         st.image(
                             clothes_image, 
                             caption=f"Outfit {item_idx+1}", 
                             use_container_width=False,
-                            width=240
+                            width=THUMBNAIL_SIZE[0]
                         )
                         
                         if st.button(f"Choose Outfit {item_idx+1}", key=f"select_{item_idx}"):
@@ -158,16 +171,69 @@ def display_clothes_selection(clothes_options):
     
     return selected_clothes
 
+@st.fragment(run_every=0.5)
+def display_job_status():
+    """Poll this session's generation job, showing its progress events and rerunning the page once it finishes"""
+    job = get_job_queue().get(st.session_state.job_id)
+    
+    if job is None:
+        st.session_state.job_id = None
+        st.rerun()
+    
+    events = list(job.events)
+    stored_event = next((event for event in events if isinstance(event, Stored)), None)
+    
+    if job.active:
+        if job.status == QUEUED:
+            ahead = get_job_queue().position(job.id)
+            st.info(f"⏳ Waiting for a free stylist... {ahead} request(s) ahead of you")
+        elif stored_event is not None:
+            st.info("🎀 Adding the finishing touches...")
+        elif PIPELINE_MODE == "single_call" or any(isinstance(event, PoseReady) for event in events):
+            st.info(f"✨ Creating your pet's fashionable look... ({job.run_seconds:.0f}s)")
+        else:
+            st.info(f"🔍 Studying your pet's pose... ({job.run_seconds:.0f}s)")
+        
+        # The image model's commentary, as it streams in
+        text = "".join(event.text for event in events if isinstance(event, TextChunk)).strip()
+        if text:
+            st.caption(text)
+        return
+    
+    st.session_state.job_id = None
+    if job.status == DONE and stored_event is None:
+        st.session_state.job_message = ('error', "❌ The stylist couldn't produce an image this time.", None)
+    elif job.status == DONE:
+        st.session_state.generated_result = stored_event.handle
+        st.session_state.job_message = ('success', "Your pet looks absolutely adorable!", None)
+    else:
+        st.session_state.job_message = ('error', job_error_message(job.error), job.traceback)
+    st.rerun()
+
+def job_error_message(error):
+    """Turn a failed job's exception into a message for the user"""
+    from google.genai import errors
+    
+    if isinstance(error, CircuitOpenError) or (isinstance(error, errors.APIError) and error.code in (429, 503)):
+        return "❌ Our stylists are very busy right now."
+    if isinstance(error, DeadlineExceededError):
+        return "❌ Styling took too long this time."
+    return f"❌ Oops! Something went wrong: {error}"
+
 def main():
     # Main header
     st.markdown("<h1 class='main-header'>Pet Fashion Designer</h1>", unsafe_allow_html=True)
     st.markdown("Give your beloved pets a stylish makeover with our fun clothing collection! 🐾✨")
     
     # Initialize session state
-    if 'generated_image' not in st.session_state:
-        st.session_state.generated_image = None
+    if 'generated_result' not in st.session_state:
+        st.session_state.generated_result = None
     if 'selected_clothes' not in st.session_state:
         st.session_state.selected_clothes = None
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
     
     # Sidebar for settings (API key input removed)
     with st.sidebar:
@@ -187,68 +253,87 @@ def main():
         )
         
         if uploaded_file is not None:
-            # Display uploaded image
-            animal_image = Image.open(uploaded_file)
-            st.image(animal_image, caption="Your Pet", use_container_width=True)
+            # Display the uploaded bytes as they are, without decoding or re-encoding
+            st.image(uploaded_file.getvalue(), caption="Your Pet", use_container_width=True)
             
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-                animal_image.save(tmp_file.name)
-                temp_animal_path = tmp_file.name
+            # Prepare the photo for the model only when a different file is uploaded
+            if st.session_state.get('animal_upload_id') != uploaded_file.file_id:
+                st.session_state.animal_image = shared_generator().preprocessor.prepare(uploaded_file.getvalue())
+                st.session_state.animal_upload_id = uploaded_file.file_id
+                if PIPELINE_MODE == "speculative":
+                    # Runs while the user browses outfits; the result lands in the pose cache
+                    shared_generator().prefetch_pose(st.session_state.animal_image)
+            animal_image = st.session_state.animal_image
         else:
-            temp_animal_path = None
+            animal_image = None
     
     with col2:
         st.subheader("Styled Pet Result")
         
-        if st.session_state.generated_image:
-            st.image(st.session_state.generated_image, caption="Your Fashionable Pet", use_container_width=True)
-        else:
+        if st.session_state.job_id:
+            display_job_status()
+        
+        generated_image = None
+        if st.session_state.generated_result:
+            generated_image = get_result_store().get(st.session_state.generated_result)
+        
+        if generated_image:
+            st.image(generated_image, caption="Your Fashionable Pet", use_container_width=True)
+        elif st.session_state.generated_result and not st.session_state.job_id:
+            st.info("Your last styled photo has expired. Click \"Style My Pet\" to create it again!")
+        elif not st.session_state.job_id:
             st.info("Upload your pet's photo and choose an outfit to see the magical transformation!")
     
     # Clothes selection
-    clothes_options = load_clothes_options()
+    clothes_options = get_clothes_catalog().options()
     selected_clothes = display_clothes_selection(clothes_options)
     
     # Generation section
     st.markdown("---")
     
-    if temp_animal_path and selected_clothes:
+    if animal_image and selected_clothes:
         col_gen1, col_gen2, col_gen3 = st.columns([1, 2, 1])
         
         with col_gen2:
-            if st.button("Style My Pet", type="primary"):
-                try:
-                    with st.spinner("Creating your pet's fashionable look... This may take a few moments!"):
-                        # Initialize generator without API key
-                        generator = AnimalClothesGenerator()
-                        
-                        # Generate the image
-                        generated_image = generator.generate_dressed_animal(
-                            animal_image_path=temp_animal_path,
-                            clothes_image_path=selected_clothes['image_path'],
-                            clothes_description_path=selected_clothes['description_path'],
-                            show_image=False,  # Don't show in separate window
-                            save_path=None
-                        )
-                        
-                        # Store in session state
-                        st.session_state.generated_image = generated_image
-                        
-                        st.success("Your pet looks absolutely adorable!")
-                        
-                        # Rerun to display the new image
-                        st.rerun()
-                        
-                except Exception as e:
-                    st.error(f"❌ Oops! Something went wrong: {str(e)}")
+            # Outcome of the last job, reported once after it finished
+            job_message = st.session_state.pop('job_message', None)
+            if job_message:
+                kind, text, details = job_message
+                if kind == 'success':
+                    st.success(text)
+                else:
+                    st.error(text)
                     st.error("Please try again later.")
                     
                     # Show detailed error in expander for debugging
-                    with st.expander("🔍 Show detailed error"):
-                        st.code(traceback.format_exc())
+                    if details:
+                        with st.expander("🔍 Show detailed error"):
+                            st.code(details)
+            
+            if st.button("Style My Pet", type="primary", disabled=bool(st.session_state.job_id)):
+                from gen_image import PIPELINE_SINGLE_CALL, PIPELINE_TWO_CALL
+                
+                try:
+                    # Queue the generation and return immediately; display_job_status polls it
+                    st.session_state.job_id = get_job_queue().submit_stream(
+                        st.session_state.session_id,
+                        style_pet,
+                        get_result_store(),
+                        st.session_state.session_id,
+                        animal_image_path=animal_image,
+                        clothes_image_path=selected_clothes['image_path'],
+                        clothes_description_path=selected_clothes['description_path'],
+                        clothes_description=selected_clothes.get('description'),
+                        save_path=None,
+                        timeout=GENERATION_TIMEOUT_SECONDS,
+                        pipeline=PIPELINE_SINGLE_CALL if PIPELINE_MODE == "single_call" else PIPELINE_TWO_CALL
+                    )
+                    st.rerun()
+                    
+                except QueueFullError as e:
+                    st.warning(f"⚠️ {e}")
     
-    elif not temp_animal_path:
+    elif not animal_image:
         st.warning("⚠️ Please upload a photo of your pet first.")
     elif not selected_clothes:
         st.warning("⚠️ Please choose an adorable outfit for your pet.")
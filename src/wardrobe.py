@@ -0,0 +1,44 @@
+# python src/wardrobe.py images/animals/dog_1.png --output-dir output/wardrobe
+import argparse
+import logging
+import time
+
+from catalog import CLOTHES_DESCRIBE_DIR, CLOTHES_DIR, load_clothes_options
+from gen_image import AnimalClothesGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dress one pet in every outfit of the catalog.")
+    parser.add_argument("animal_image_path", help="Path to the pet photo")
+    parser.add_argument("--output-dir", default="output/wardrobe", help="Where to write images and manifest.json")
+    parser.add_argument("--clothes-dir", default=CLOTHES_DIR, help="Directory with outfit images")
+    parser.add_argument("--describe-dir", default=CLOTHES_DESCRIBE_DIR, help="Directory with outfit descriptions")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Maximum parallel image generation calls (default: one per outfit, "
+                             "capped by the image model's burst)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    clothes_options = load_clothes_options(args.clothes_dir, args.describe_dir)
+    if not clothes_options:
+        parser.error(f"No outfits found in {args.clothes_dir} with descriptions in {args.describe_dir}")
+
+    generator = AnimalClothesGenerator()
+
+    start = time.perf_counter()
+    failures = 0
+    for index, entry in enumerate(generator.generate_wardrobe(args.animal_image_path, clothes_options,
+                                                               args.output_dir, max_workers=args.workers), 1):
+        if entry['status'] == 'ok':
+            print(f"[{index}/{len(clothes_options)}] {entry['name']}: {entry['output_path']} "
+                  f"({entry['latency_seconds']:.1f}s)")
+        else:
+            failures += 1
+            print(f"[{index}/{len(clothes_options)}] {entry['name']}: FAILED - {entry['error']}")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s, {failures} failed. "
+          f"Manifest: {args.output_dir}/manifest.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from google.genai import errors
+
+from cache import PoseCache
+from fake_client import FakeClient
+from gen_image import IMAGE_MODEL, PIPELINE_SINGLE_CALL, AnimalClothesGenerator
+from scheduler import CircuitOpenError, DeadlineExceededError, ModelScheduler
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ANIMAL_IMAGE_PATH = os.path.join(ROOT_DIR, "images/animals/dog_1.png")
+CLOTHES_IMAGE_PATH = os.path.join(ROOT_DIR, "images/clothes/clothes_1.png")
+CLOTHES_DESCRIPTION_PATH = os.path.join(ROOT_DIR, "images/clothes_describe/clothes_1.txt")
+
+
+def make_generator(client, reset_seconds=60.0):
+    # Single attempts and no backoff, so every call is exactly one breaker outcome
+    scheduler = ModelScheduler(max_attempts=1, base_backoff=0.0, failure_threshold=2, reset_seconds=reset_seconds)
+    return AnimalClothesGenerator(client=client, pose_cache=PoseCache(cache_dir=None), use_result_cache=False,
+                                  scheduler=scheduler, pipeline=PIPELINE_SINGLE_CALL)
+
+
+def generate(generator, timeout=None):
+    return generator.generate_dressed_animal(ANIMAL_IMAGE_PATH, CLOTHES_IMAGE_PATH, CLOTHES_DESCRIPTION_PATH,
+                                             show_image=False, timeout=timeout)
+
+
+def test_server_errors_open_the_circuit():
+    generator = make_generator(FakeClient(error_rate=1.0, error_code=503))
+    for _ in range(2):
+        with pytest.raises(errors.ServerError):
+            generate(generator)
+    with pytest.raises(CircuitOpenError):
+        generate(generator)
+
+
+def test_throttling_keeps_the_circuit_closed():
+    generator = make_generator(FakeClient(error_rate=1.0, error_code=429))
+    for _ in range(3):
+        with pytest.raises(errors.ClientError):
+            generate(generator)
+    assert not generator.scheduler.breaker(IMAGE_MODEL).is_open
+
+
+def test_caller_timeout_is_a_deadline_error_not_a_model_failure():
+    generator = make_generator(FakeClient(latency=0.3))
+    for _ in range(3):
+        with pytest.raises(DeadlineExceededError):
+            generate(generator, timeout=0.1)
+    assert not generator.scheduler.breaker(IMAGE_MODEL).is_open
+    assert generate(generator) is not None
+
+
+def test_only_client_errors_close_an_open_circuit():
+    client = FakeClient(error_rate=1.0, error_code=503)
+    generator = make_generator(client, reset_seconds=0.0)
+    breaker = generator.scheduler.breaker(IMAGE_MODEL)
+    for _ in range(2):
+        with pytest.raises(errors.ServerError):
+            generate(generator)
+    assert breaker.is_open
+
+    # A probe failing outside the model (here: a response that cannot be parsed) proves nothing
+    client.error_rate = 0.0
+    client.responses[IMAGE_MODEL] = None
+    with pytest.raises(AttributeError):
+        list(generator.stream_dressed_animal(ANIMAL_IMAGE_PATH, CLOTHES_IMAGE_PATH, CLOTHES_DESCRIPTION_PATH))
+    assert breaker.is_open
+
+    # A 400 is an answer from a healthy model
+    client.responses.clear()
+    client.error_rate, client.error_code = 1.0, 400
+    with pytest.raises(errors.ClientError):
+        generate(generator)
+    assert not breaker.is_open